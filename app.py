@@ -1,48 +1,333 @@
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+# pandas_ta / plotly / yfinance / aiohttp / numba / hmmlearn ถูก import เมื่อขั้นที่ใช้ทำงานครั้งแรก
+# (รายการ module ที่ import ตอนเริ่มอยู่ใน startup.APP_IMPORTS)
+_import_start = time.perf_counter()
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 
+from async_fetch import warm_store
+from backtest import run_backtest
+from bar_store import BarStore
+from charts import DOWNSAMPLE_METHODS, TRANSPORTS, add_signal_layers, base_figure, columnar_html
+from compact import compact_columns
+from disk_cache import DiskCache
+from indicators import IndicatorEngine, IndicatorStream
+from kernels import DECISION_COLUMNS, decide
+from optimize import OBJECTIVES, best_params, run_sweep
+from parallel import make_pool, scan_parallel, sweep_parallel
+from providers import SOURCES, make_provider
+from regime import GATES, REGIME_NAMES, RegimeModel, regime_gate
+from scanner import frames_from_bars, parse_universe
+from shared_cache import SharedFrameCache
+from startup import APP_IMPORTS, importtime
+from signal_store import SignalStore, compute_signals
+from support_resistance import SRTable
+from timeframes import TIMEFRAMES, higher_trend, plan, to_timeframe
+
+# เวลา import ครั้งแรกของ process (rerun ถัดไป module อยู่ใน cache แล้ว)
+@st.cache_resource
+def get_boot_stats():
+    return {"import_s": time.perf_counter() - _import_start, "booted": datetime.now()}
+
+boot_stats = get_boot_stats()
+
 # --- 1. SETTING UI ---
 st.set_page_config(page_title="Safe Rule-Based System", layout="wide")
 st.title("🎯 Strict Strategy: MACD + RSI + S/R + Patterns")
 
 # --- 2. SIDEBAR CONFIGURATION ---
 st.sidebar.header("⚙️ System Config")
+mode = st.sidebar.radio("Mode", ["Single Ticker", "Scanner", "Live"], horizontal=True)
+data_source = st.sidebar.selectbox("Data Source", SOURCES)
+data_dir = st.sidebar.text_input("Data Directory", value=os.environ.get("MACD_DATA_DIR", "data")) if data_source == "Local files" else None
 symbol = st.sidebar.text_input("Ticker Symbol", value="BTC-USD").upper()
 days_back = st.sidebar.slider("Lookback Period (Days)", 60, 1000, 365)
+# 1w และ timeframe ที่ใช้ยืนยันได้จากการ resample ข้อมูลที่โหลดมาแล้ว ไม่ต้องโหลดใหม่
+timeframe = st.sidebar.selectbox("Timeframe", TIMEFRAMES, index=TIMEFRAMES.index("1d"))
+confirm_tf = st.sidebar.selectbox("Confirm with higher timeframe MACD", ["None"] + TIMEFRAMES[TIMEFRAMES.index(timeframe) + 1:])
+regime_filter = st.sidebar.selectbox("Regime filter (HMM)", GATES)
+# ลดหน่วยความจำของข้อมูลที่เก็บไว้นาน (แท่งใน bar store และ frame ใน shared cache): float32 เมื่อความละเอียดพอ
+# ตัวชี้วัดและการตัดสินใจยังคำนวณด้วย float64
+compact_mode = st.sidebar.checkbox("Compact memory (float32 cached bars)", value=os.environ.get("MACD_COMPACT", "0") == "1")
+# คำนวณครั้งเดียวต่อข้อมูล + พารามิเตอร์ แล้วทุก session/process ของ server อ่าน frame เดียวกันแบบ memory-map
+shared_mode = st.sidebar.checkbox("Shared cross-session cache", value=os.environ.get("MACD_SHARED_CACHE", "0") == "1")
 
 with st.sidebar.expander("Strategy Thresholds"):
     rsi_low = st.sidebar.slider("RSI Buy Zone (Lower than)", 10, 50, 40)
     rsi_high = st.sidebar.slider("RSI Sell Zone (Higher than)", 50, 90, 65)
     sr_window = st.sidebar.slider("S/R Lookback Window", 10, 50, 20)
+    fee_pct = st.sidebar.number_input("Backtest Fee per Trade (%)", 0.0, 1.0, 0.1, step=0.05)
+
+with st.sidebar.expander("Chart Rendering"):
+    # Auto: ข้อมูลยาวเกิน FAST_CHART_BARS จะใช้ WebGL + ลดจุดฝั่ง server อัตโนมัติ
+    render_mode = st.radio("Mode", ["Auto", "Full", "Fast (WebGL)"], horizontal=True)
+    max_points = st.number_input("Max points (≈ chart width in px)", 200, 10000, 1500, step=100)
+    downsample_method = st.selectbox("Line downsampling", DOWNSAMPLE_METHODS)
+    # Columnar: แกน x ส่งครั้งเดียวใช้ร่วมทุก trace และตัวเลขส่งเป็น binary (payload เล็กลงมากเมื่อข้อมูลยาว)
+    chart_transport = st.selectbox("Transport", TRANSPORTS)
+
+FAST_CHART_BARS = 5000
+
+with st.sidebar.expander("⏱ Startup"):
+    st.write(f"First-run imports: {boot_stats['import_s'] * 1000:.0f} ms (booted {boot_stats['booted']:%H:%M:%S})")
+    if st.button("Profile import cost"):
+        # import ทุก module ของ app ใน process ใหม่ (cold) แล้วแยกเวลาตาม package
+        rows, total = importtime(APP_IMPORTS)
+        st.write(f"Cold import total: {total * 1000:.0f} ms")
+        st.dataframe(pd.DataFrame([(package, seconds * 1000) for package, seconds in rows], columns=["Package", "ms"]), hide_index=True)
 
 # --- 3. DATA FETCHING ---
-@st.cache_data
-def get_data(ticker, days):
+# store ใช้ร่วมกันทุก session (หนึ่งตัวต่อแหล่งข้อมูล): เลื่อน Lookback จะตัดข้อมูลจากที่โหลดไว้แล้ว
+# และโหลดเพิ่มเฉพาะช่วงที่ขาด ข้อมูลจาก yfinance ถูกเก็บลงดิสก์ด้วย (ตั้งค่าผ่าน environment)
+# เพื่อให้ restart แล้วไม่ต้องโหลดใหม่ ส่วนไฟล์ในเครื่อง/ข้อมูลสังเคราะห์อ่านเร็วอยู่แล้วจึงไม่ต้อง cache ลงดิสก์
+@st.cache_resource
+def get_bar_store(source="yfinance", data_dir=None, compact=False):
+    tail_ttl = timedelta(minutes=int(os.environ.get("MACD_CACHE_TTL_MIN", "15")))
+    if source != "yfinance":
+        return BarStore(downloader=make_provider(source, data_dir).download, tail_ttl=tail_ttl, compact=compact)
+
+    cache = DiskCache(
+        os.environ.get("MACD_CACHE_DIR", ".cache/bars"),
+        max_bytes=int(os.environ.get("MACD_CACHE_MAX_MB", "512")) * 1024 * 1024,
+    )
+    store = BarStore(downloader=make_provider(source).download, cache=cache, tail_ttl=tail_ttl, compact=compact)
+
+    # warm-up ตอนเปิดตลาด: โหลด ticker ยอดนิยมแบบ async ไว้ล่วงหน้าใน background
+    warm_tickers = parse_universe(os.environ.get("MACD_WARM_TICKERS", ""))
+    if warm_tickers:
+        warm_start = datetime.now() - timedelta(days=int(os.environ.get("MACD_WARM_DAYS", "1000")))
+        threading.Thread(target=warm_store, args=(store, warm_tickers, warm_start), daemon=True).start()
+    return store
+
+def get_data(ticker, days, source="yfinance", data_dir=None, interval="1d", compact=False):
     try:
         start = datetime.now() - timedelta(days=days)
-        # ใช้ multi_level_index=False เพื่อป้องกันปัญหา Column ซ้อนกันใน yfinance รุ่นใหม่
-        data = yf.download(ticker, start=start, multi_level_index=False)
-        if data.empty:
-            return None
-        return data
+        return get_bar_store(source, data_dir, compact).get(ticker, start, interval=interval)
     except:
         return None
 
+# Scanner: โหลดทั้ง universe แบบ async เข้า bar store เดียวกับ get_data (cache แยกจาก threshold
+# เพื่อให้ปรับ slider แล้วไม่โหลดใหม่)
+@st.cache_data(ttl=900)
+def get_universe_data(tickers, days, source="yfinance", data_dir=None, compact=False):
+    start = datetime.now() - timedelta(days=days)
+    store = get_bar_store(source, data_dir, compact)
+    errors = warm_store(store, list(tickers), start) if source == "yfinance" else {}
+    bars = {}
+    for ticker in tickers:
+        if ticker not in errors:
+            try:
+                bars[ticker] = store.get(ticker, start)
+            except Exception:
+                continue
+    return frames_from_bars(bars)
+
+# process pool ของ Scanner และ Parameter Sweep ใช้ร่วมกันทุก rerun/session (ไม่ต้องเปิด worker และ import ใหม่ทุกครั้ง)
+@st.cache_resource
+def get_process_pool(workers):
+    return make_pool(workers)
+
+if mode == "Scanner":
+    st.subheader("🔎 Universe Scanner (Latest Bar)")
+    universe_text = st.sidebar.text_area("Universe (one ticker per line or comma separated)", value="BTC-USD, ETH-USD, AAPL, MSFT, NVDA")
+    universe_file = st.sidebar.file_uploader("...or upload a ticker list", type=["txt", "csv"])
+    if universe_file is not None:
+        universe_text = universe_file.getvalue().decode("utf-8")
+    tickers = parse_universe(universe_text)
+    workers = st.sidebar.number_input("Worker processes", 1, os.cpu_count() or 1, os.cpu_count() or 1)
+    only_signals = st.checkbox("Show only tickers firing Final_Buy / Final_Sell", value=True)
+
+    if not tickers:
+        st.warning("กรุณาระบุ ticker อย่างน้อย 1 ตัว")
+        st.stop()
+    try:
+        with st.spinner(f"Scanning {len(tickers)} tickers..."):
+            result = scan_parallel(get_universe_data(tuple(tickers), days_back, data_source, data_dir, compact_mode), rsi_low, rsi_high, sr_window,
+                                   workers=int(workers), executor=get_process_pool(int(workers)))
+    except BrokenProcessPool as e:
+        # worker ตาย pool นี้ใช้ต่อไม่ได้ ทิ้งจาก cache ให้ rerun ถัดไปสร้างใหม่
+        get_process_pool.clear()
+        st.error(f"เกิดข้อผิดพลาด: {e}")
+        st.stop()
+    except Exception as e:
+        st.error(f"เกิดข้อผิดพลาด: {e}")
+        st.stop()
+
+    if result.empty:
+        st.warning("ไม่พบข้อมูลของ ticker ที่ระบุ")
+        st.stop()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Scanned", len(result))
+    c2.metric("🟢 Final_Buy", int(result['Final_Buy'].sum()))
+    c3.metric("🔴 Final_Sell", int(result['Final_Sell'].sum()))
+    if only_signals:
+        result = result[result['Final_Buy'] | result['Final_Sell']]
+    st.dataframe(result, use_container_width=True)
+    st.stop()
+
+# S/R ของทุก window (10-50) คำนวณครั้งเดียวต่อ series ใช้ร่วมกันระหว่าง slider และ parameter sweep
+@st.cache_resource(max_entries=32)
+def get_sr_table(low, high):
+    return SRTable(low, high)
+
+# Engulfing ขึ้นกับ OHLC อย่างเดียว ไม่ต้องคำนวณใหม่เมื่อปรับ threshold หรือ S/R window
+@st.cache_data(max_entries=32)
+def get_patterns(ohlc):
+    import pandas_ta as ta
+
+    # แก้ไขโดยการเช็ค None ก่อน Subscript
+    patterns = ta.cdl_pattern(ohlc['Open'], ohlc['High'], ohlc['Low'], ohlc['Close'], name="engulfing")
+    if patterns is not None and 'CDL_ENGULFING' in patterns.columns:
+        return patterns['CDL_ENGULFING'] > 0, patterns['CDL_ENGULFING'] < 0
+    # ถ้าหาไม่เจอหรือ Error ให้กำหนดเป็น False ทั้งหมด
+    return False, False
+
+# กราฟส่วนที่ขึ้นกับข้อมูล + S/R window เท่านั้น (คืน object เดิม ห้ามแก้ตรงๆ ให้คัดลอกก่อน)
+@st.cache_resource(max_entries=16)
+def get_base_figure(plot_df, m_line, m_signal, max_points, webgl, method):
+    return base_figure(plot_df, m_line, m_signal, max_points=max_points, webgl=webgl, method=method)
+
+def show_chart(fig):
+    if chart_transport == "Columnar (binary)":
+        import streamlit.components.v1 as components
+
+        components.html(columnar_html(fig), height=(fig.layout.height or 450) + 10)
+    else:
+        st.plotly_chart(fig, use_container_width=True)
+
+# Live: แต่ละ symbol มี LiveChart ของตัวเองใน session ที่อัปเดตเฉพาะแท่งใหม่ และ patch รูปเดิม
+if mode == "Live":
+    from live import LiveChart, StoreFeed, SyntheticFeed
+
+    st.subheader("📡 Live Monitor")
+    live_text = st.sidebar.text_input("Live symbols (comma separated)", value=symbol)
+    live_symbols = parse_universe(live_text)
+    feed_source = st.sidebar.radio("Feed", [f"{data_source} (1m)", "Synthetic ticks (local)"])
+    poll_seconds = st.sidebar.number_input("Poll interval (seconds)", 1, 300, 5)
+
+    live_key = (feed_source, data_dir, rsi_low, rsi_high, sr_window)
+    if st.session_state.get("live_key") != live_key:
+        st.session_state["live_key"] = live_key
+        st.session_state["live_charts"] = {}
+        st.session_state["live_feeds"] = {}
+    charts, feeds = st.session_state["live_charts"], st.session_state["live_feeds"]
+
+    @st.fragment(run_every=timedelta(seconds=int(poll_seconds)))
+    def live_panel():
+        for ticker in live_symbols:
+            if ticker not in feeds:
+                feeds[ticker] = SyntheticFeed(seed=len(feeds)) if feed_source.startswith("Synthetic") else StoreFeed(get_bar_store(data_source, data_dir, compact_mode), ticker)
+                charts[ticker] = LiveChart(rsi_low, rsi_high, sr_window)
+            chart = charts[ticker]
+            try:
+                patched = chart.update(feeds[ticker].poll())
+            except Exception as e:
+                st.error(f"{ticker}: เกิดข้อผิดพลาด: {e}")
+                continue
+            if chart.fig is None:
+                st.warning(f"{ticker}: ไม่พบข้อมูล")
+                continue
+            last = chart.frame.iloc[-1]
+            st.write(f"**{ticker}** · {chart.frame.index[-1]} · Close {last['Close']:.4f} · "
+                     f"{'🟢 BUY' if last['Final_Buy'] else '🔴 SELL' if last['Final_Sell'] else '—'} · "
+                     f"patched: {', '.join(patched) if patched else 'none'}")
+            st.plotly_chart(chart.fig, use_container_width=True, key=f"live_{ticker}")
+
+    live_panel()
+    st.stop()
+
+# Parameter sweep: MACD/RSI ถูกคำนวณแล้วใน df ส่งเข้าไปใช้ซ้ำ ไม่คำนวณใหม่ทุกชุดพารามิเตอร์
+@st.cache_data
+# grid เต็มแบ่ง sr_window ไปรันใน process pool เดียวกับ Scanner, random search รันที่นี่ด้วย SRTable ที่ cache ไว้
+def get_sweep(ind, fee, n_samples):
+    args = (ind['Close'], ind['Low'], ind['High'], ind['RSI'], ind.iloc[:, 4], ind.iloc[:, 5])
+    if n_samples is not None:
+        return run_sweep(*args, fee=fee, n_samples=n_samples, sr_table=get_sr_table(ind['Low'], ind['High']))
+    workers = os.cpu_count() or 1
+    return sweep_parallel(*args, fee=fee, workers=workers, executor=get_process_pool(workers))
+
+# สัญญาณที่ signal_job.py คำนวณไว้แล้ว (ตรงกับ ticker/แหล่งข้อมูล/threshold และยังไม่หมดอายุ) ไม่มีก็คืน None
+@st.cache_resource
+def get_signal_store():
+    return SignalStore(os.environ.get("MACD_SIGNAL_DIR", ".cache/signals"))
+
+def get_precomputed(ticker, days, source, data_dir=None):
+    try:
+        start = datetime.now() - timedelta(days=days)
+        max_age = timedelta(minutes=int(os.environ.get("MACD_SIGNAL_TTL_MIN", "60")))
+        return get_signal_store().load(ticker, source, rsi_low, rsi_high, sr_window, start=start, max_age=max_age,
+                                        data_dir=data_dir)
+    except Exception:
+        return None
+
+# Shared cache: key คือแหล่งข้อมูล/ticker/timeframe + ตัวตนของข้อมูล (แท่งแรก/แท่งสุดท้าย/จำนวน/OHLC แท่งล่าสุด)
+# + threshold ข้อมูลอัปเดตเมื่อไรก็ได้ key ใหม่เอง ชุดเก่าถูกลบตาม LRU
+@st.cache_resource
+def get_shared_cache():
+    return SharedFrameCache(os.environ.get("MACD_SHARED_DIR") or None,
+                            max_bytes=int(os.environ.get("MACD_SHARED_MAX_MB", "256")) * 1024 * 1024)
+
+def get_shared_signals(bars, key):
+    last = tuple(float(v) for v in bars[['Open', 'High', 'Low', 'Close']].iloc[-1])
+    ident = (*key, str(bars.index[0]), str(bars.index[-1]), len(bars), last, rsi_low, rsi_high, sr_window, compact_mode)
+
+    def compute():
+        # เงื่อนไข (bool) คำนวณจาก float64 ก่อน แล้วจึงเก็บราคา/ตัวชี้วัดแบบ compact
+        signals = compute_signals(bars, rsi_low, rsi_high, sr_window)
+        return compact_columns(signals) if compact_mode else signals
+
+    return get_shared_cache().get_or_compute(ident, compute)
+
+# HMM ต่อ ticker/timeframe/แท่งแรกของข้อมูล ใช้ร่วมกันทุก session: fit ครั้งแรกแล้ว fit ต่อ (warm start) ตามรอบหรือเมื่อเกิด drift
+# แท่งแรกเป็นส่วนหนึ่งของ key เพื่อให้แต่ละ Lookback มี model ของตัวเอง (ไม่ต้อง fit ใหม่ทั้งหมดเมื่อสลับไปมา)
+@st.cache_resource(max_entries=64)
+def get_regime_model(key):
+    return RegimeModel()
+
+# สถานะ MACD/RSI ต่อ ticker ของแต่ละ session: rerun จะคำนวณเฉพาะแท่งที่เพิ่ม/เปลี่ยน
+def get_indicator_stream(key):
+    streams = st.session_state.setdefault("indicator_streams", {})
+    if key not in streams:
+        streams[key] = IndicatorStream()
+    return streams[key]
+
 try:
-    df = get_data(symbol, days_back)
+    # ผลคำนวณล่วงหน้ามีเฉพาะรายวันและไม่รวมเงื่อนไขยืนยันจาก timeframe อื่น
+    df = get_precomputed(symbol, days_back, data_source, data_dir) if timeframe == "1d" and confirm_tf == "None" else None
+    precomputed = df is not None
+    if not precomputed:
+        base_interval, fetch_days = plan(timeframe, days_back, get_bar_store(data_source, data_dir, compact_mode), symbol)
+        if fetch_days < days_back:
+            st.info(f"Timeframe {timeframe} โหลดย้อนหลังได้สูงสุด {fetch_days} วัน")
+        base_df = get_data(symbol, fetch_days, data_source, data_dir, base_interval, compact_mode)
+        df = to_timeframe(base_df, base_interval, timeframe)
 
-    if df is not None and len(df) > sr_window:
+    if df is not None and len(df) > sr_window and precomputed:
+        # ผลจาก signal_job.py: ไม่ต้องโหลดและคำนวณใหม่
+        m_line, m_hist, m_signal = IndicatorEngine().columns[:3]
+        cond = {column: df[column].to_numpy() for column in DECISION_COLUMNS}
+        st.caption(f"⚡ ใช้สัญญาณที่คำนวณล่วงหน้า (ถึง {df.index[-1]})")
+
+    elif df is not None and len(df) > sr_window and shared_mode:
+        df = get_shared_signals(df, (data_source, data_dir, symbol, timeframe))
+        m_line, m_hist, m_signal = IndicatorEngine().columns[:3]
+        cond = {column: df[column].to_numpy() for column in DECISION_COLUMNS}
+
+    elif df is not None and len(df) > sr_window:
         # --- CALCULATIONS ---
-        
-        # 1. MACD (ตรวจสอบ None)
-        macd = ta.macd(df['Close'])
-        if macd is not None:
-            df = pd.concat([df, macd], axis=1)
+        indicators = get_indicator_stream((data_source, data_dir, symbol, timeframe)).sync(df['Close'])
+
+        # 1. MACD (ตรวจสอบว่ามีค่า)
+        macd = indicators.iloc[:, :3]
+        if macd.iloc[:, 0].notna().any():
+            # เพิ่มทีละคอลัมน์ (ไม่คัดลอกทั้งตารางแบบ pd.concat)
+            for column in macd.columns:
+                df[column] = macd[column]
             m_line = macd.columns[0]
             m_hist = macd.columns[1]
             m_signal = macd.columns[2]
@@ -51,67 +336,77 @@ try:
             st.stop()
 
         # 2. RSI & Trend
-        rsi_series = ta.rsi(df['Close'], length=14)
-        if rsi_series is not None:
+        rsi_series = indicators.iloc[:, 3]
+        if rsi_series.notna().any():
             df['RSI'] = rsi_series
             df['RSI_Up'] = df['RSI'] > df['RSI'].shift(1)
         else:
             st.error("ไม่สามารถคำนวณ RSI ได้")
             st.stop()
 
-        # 3. Support & Resistance
-        df['Support'] = df['Low'].rolling(window=sr_window).min()
-        df['Resistance'] = df['High'].rolling(window=sr_window).max()
+        # 3. Support & Resistance (เลือกแถวจากตารางที่คำนวณทุก window ไว้แล้ว)
+        sr_table = get_sr_table(df['Low'], df['High'])
+        df['Support'], df['Resistance'] = sr_table.get(sr_window)
 
-        # 4. Candlestick Patterns (จุดที่มักเกิด Error)
-        # แก้ไขโดยการเช็ค None ก่อน Subscript
-        patterns = ta.cdl_pattern(df['Open'], df['High'], df['Low'], df['Close'], name="engulfing")
-        if patterns is not None and 'CDL_ENGULFING' in patterns.columns:
-            df['Bullish_Engulfing'] = patterns['CDL_ENGULFING'] > 0
-            df['Bearish_Engulfing'] = patterns['CDL_ENGULFING'] < 0
-        else:
-            # ถ้าหาไม่เจอหรือ Error ให้กำหนดเป็น False ทั้งหมด
-            df['Bullish_Engulfing'] = False
-            df['Bearish_Engulfing'] = False
+        # 4. Candlestick Patterns (ขึ้นกับ OHLC อย่างเดียว จึง cache แยก)
+        df['Bullish_Engulfing'], df['Bearish_Engulfing'] = get_patterns(df[['Open', 'High', 'Low', 'Close']])
 
         # --- 4. STRICT DECISION LOGIC ---
+        # ประเมินทุกเงื่อนไขในรอบเดียว (ไม่สร้าง Series กลางทาง/shift) ได้ bool array ชุดเดียวกับ evaluate_conditions
+        cond = decide(df['Low'], df['High'], df['Support'], df['Resistance'], df['RSI'], df[m_line], df[m_signal],
+                      rsi_low, rsi_high)
+        df['Final_Buy'] = cond['Final_Buy']
+        df['Final_Sell'] = cond['Final_Sell']
+
+    if df is not None and len(df) > sr_window:
+        # ยืนยันด้วย MACD ของ timeframe ที่สูงกว่า (แท่งที่ปิดแล้วล่าสุด): ซื้อเมื่อ MACD อยู่เหนือ Signal ขายเมื่ออยู่ใต้
+        if confirm_tf != "None":
+            cond['confirm_buy'], cond['confirm_sell'] = higher_trend(base_df, confirm_tf, df.index)
+            df['Final_Buy'] = cond['Final_Buy'] = cond['Final_Buy'] & cond['confirm_buy']
+            df['Final_Sell'] = cond['Final_Sell'] = cond['Final_Sell'] & cond['confirm_sell']
+
+        # กรองสัญญาณตาม regime (HMM บน return/volatility) ณ แท่งนั้น
+        if regime_filter != "Off":
+            regimes = get_regime_model((data_source, data_dir, symbol, timeframe, str(df.index[0]))).regimes(df['Close'])
+            cond['regime_buy'], cond['regime_sell'] = regime_gate(regimes, regime_filter)
+            df['Final_Buy'] = cond['Final_Buy'] = cond['Final_Buy'] & cond['regime_buy']
+            df['Final_Sell'] = cond['Final_Sell'] = cond['Final_Sell'] & cond['regime_sell']
+            st.caption(f"Regime (HMM) ล่าสุด: {REGIME_NAMES[regimes[-1]]}")
+
+        # ค่าแท่งล่าสุดสำหรับ checklist
+        latest = lambda name: bool(cond[name][-1])
+
         # BUY ENTRY
-        cond_buy_price = df['Low'] <= (df['Support'] * 1.02)
-        cond_buy_rsi = (df['RSI'] < rsi_low) & (df['RSI_Up'])
-        cond_buy_macd = (df[m_line] > df[m_signal]) & (df[m_line].shift(1) <= df[m_signal].shift(1))
-        df['Final_Buy'] = cond_buy_price & cond_buy_rsi & cond_buy_macd
+        cond_buy_price, cond_buy_rsi, cond_buy_macd = latest('buy_price'), latest('buy_rsi'), latest('buy_macd')
 
         # SELL EXIT
-        cond_sell_price = df['High'] >= (df['Resistance'] * 0.98)
-        cond_sell_rsi = df['RSI'] > rsi_high
-        cond_sell_macd = (df[m_line] < df[m_signal]) & (df[m_line].shift(1) >= df[m_signal].shift(1))
-        df['Final_Sell'] = cond_sell_price & cond_sell_rsi & cond_sell_macd
+        cond_sell_price, cond_sell_rsi, cond_sell_macd = latest('sell_price'), latest('sell_rsi'), latest('sell_macd')
 
         # --- 5. VISUALIZATION ---
-        fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.5, 0.25, 0.25])
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
 
-        # Price Chart
-        fig.add_trace(go.Candlestick(x=df.index, open=df['Open'], high=df['High'], low=df['Low'], close=df['Close'], name="Price"), row=1, col=1)
-        fig.add_trace(go.Scatter(x=df.index, y=df['Support'], line=dict(color='green', dash='dot', width=1), name='Support'), row=1, col=1)
-        fig.add_trace(go.Scatter(x=df.index, y=df['Resistance'], line=dict(color='red', dash='dot', width=1), name='Resistance'), row=1, col=1)
-        
-        # Buy/Sell Markers
-        if df['Final_Buy'].any():
-            fig.add_trace(go.Scatter(x=df[df['Final_Buy']].index, y=df['Low'][df['Final_Buy']] * 0.98, mode='markers', marker=dict(symbol='triangle-up', size=15, color='#00FF00'), name='ENTRY'), row=1, col=1)
-        if df['Final_Sell'].any():
-            fig.add_trace(go.Scatter(x=df[df['Final_Sell']].index, y=df['High'][df['Final_Sell']] * 1.02, mode='markers', marker=dict(symbol='triangle-down', size=15, color='#FF0000'), name='EXIT'), row=1, col=1)
-
-        # MACD
-        fig.add_trace(go.Scatter(x=df.index, y=df[m_line], line=dict(color='cyan'), name='MACD'), row=2, col=1)
-        fig.add_trace(go.Scatter(x=df.index, y=df[m_signal], line=dict(color='orange'), name='Signal'), row=2, col=1)
-
-        # RSI
-        fig.add_trace(go.Scatter(x=df.index, y=df['RSI'], line=dict(color='magenta'), name='RSI'), row=3, col=1)
-        fig.add_hline(y=rsi_high, line_dash="dash", line_color="red", row=3, col=1)
-        fig.add_hline(y=rsi_low, line_dash="dash", line_color="green", row=3, col=1)
-
-        fig.update_layout(height=800, template="plotly_dark", xaxis_rangeslider_visible=False)
-        st.plotly_chart(fig, use_container_width=True)
+        # กราฟหลักมาจาก cache (ไม่ขึ้นกับ threshold) คัดลอกแล้วเติมเฉพาะ marker และเส้น threshold
+        plot_df = df
+        view = slice(None)
+        fast_chart = render_mode == "Fast (WebGL)" or (render_mode == "Auto" and len(df) > FAST_CHART_BARS)
+        if fast_chart:
+            # เลือกช่วงที่จะดู แล้วรวม/ลดจุดใหม่เฉพาะช่วงนั้น (แทนการ zoom บนกราฟที่มีทุกแท่ง)
+            naive_index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+            view_start, view_end = st.slider(
+                "Visible range", min_value=naive_index[0].to_pydatetime(), max_value=naive_index[-1].to_pydatetime(),
+                value=(naive_index[0].to_pydatetime(), naive_index[-1].to_pydatetime()),
+            )
+            view = slice(naive_index.searchsorted(view_start), naive_index.searchsorted(view_end, side='right'))
+            plot_df = df.iloc[view]
+
+        base = get_base_figure(
+            plot_df[['Open', 'High', 'Low', 'Close', 'Support', 'Resistance', m_line, m_signal, 'RSI']], m_line, m_signal,
+            int(max_points) if fast_chart else None, fast_chart, downsample_method,
+        )
+        fig = add_signal_layers(go.Figure(base), plot_df, rsi_low, rsi_high,
+                                buy=cond['Final_Buy'][view], sell=cond['Final_Sell'][view])
+        show_chart(fig)
 
         # --- 6. DASHBOARD ---
         st.subheader("📋 Strategy Checklist (Latest Bar)")
@@ -120,15 +415,76 @@ try:
         c1, c2 = st.columns(2)
         with c1:
             st.write("### 🟢 Buy Entry Check")
-            st.checkbox("Price near Support", value=bool(cond_buy_price.iloc[-1]), disabled=True)
-            st.checkbox("RSI Oversold/Reversing", value=bool(cond_buy_rsi.iloc[-1]), disabled=True)
-            st.checkbox("MACD Golden Cross", value=bool(cond_buy_macd.iloc[-1]), disabled=True)
+            st.checkbox("Price near Support", value=cond_buy_price, disabled=True)
+            st.checkbox("RSI Oversold/Reversing", value=cond_buy_rsi, disabled=True)
+            st.checkbox("MACD Golden Cross", value=cond_buy_macd, disabled=True)
+            if 'confirm_buy' in cond:
+                st.checkbox(f"{confirm_tf} MACD above Signal", value=latest('confirm_buy'), disabled=True)
+            if 'regime_buy' in cond:
+                st.checkbox("Regime allows entry", value=latest('regime_buy'), disabled=True)
 
         with c2:
             st.write("### 🔴 Sell Exit Check")
-            st.checkbox("Price near Resistance", value=bool(cond_sell_price.iloc[-1]), disabled=True)
-            st.checkbox("RSI Overbought", value=bool(cond_sell_rsi.iloc[-1]), disabled=True)
-            st.checkbox("MACD Dead Cross", value=bool(cond_sell_macd.iloc[-1]), disabled=True)
+            st.checkbox("Price near Resistance", value=cond_sell_price, disabled=True)
+            st.checkbox("RSI Overbought", value=cond_sell_rsi, disabled=True)
+            st.checkbox("MACD Dead Cross", value=cond_sell_macd, disabled=True)
+            if 'confirm_sell' in cond:
+                st.checkbox(f"{confirm_tf} MACD below Signal", value=latest('confirm_sell'), disabled=True)
+            if 'regime_sell' in cond:
+                st.checkbox("Regime allows exit", value=latest('regime_sell'), disabled=True)
+
+        # --- 7. BACKTEST ---
+        st.subheader("📈 Backtest (Final_Buy → Final_Sell)")
+        bt = run_backtest(df['Close'], cond['Final_Buy'], cond['Final_Sell'], fee=fee_pct / 100)
+        stats = bt['stats']
+
+        m1, m2, m3, m4, m5, m6 = st.columns(6)
+        m1.metric("Total Return", f"{stats['Total Return']:.2%}", f"B&H {stats['Buy & Hold']:.2%}")
+        m2.metric("Max Drawdown", f"{stats['Max Drawdown']:.2%}")
+        m3.metric("Trades", stats['Trades'])
+        m4.metric("Win Rate", f"{stats['Win Rate']:.0%}" if stats['Trades'] else "-")
+        m5.metric("Sharpe", f"{stats['Sharpe']:.2f}" if stats['Sharpe'] == stats['Sharpe'] else "-")
+        m6.metric("Exposure", f"{stats['Exposure']:.0%}")
+
+        bt_fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.7, 0.3])
+        bt_fig.add_trace(go.Scatter(x=df.index, y=bt['equity'], line=dict(color='cyan'), name='Equity'), row=1, col=1)
+        bt_fig.add_trace(go.Scatter(x=df.index, y=df['Close'] / df['Close'].iloc[0], line=dict(color='gray', dash='dot'), name='Buy & Hold'), row=1, col=1)
+        bt_fig.add_trace(go.Scatter(x=df.index, y=bt['drawdown'], fill='tozeroy', line=dict(color='red'), name='Drawdown'), row=2, col=1)
+        bt_fig.update_layout(height=450, template="plotly_dark")
+        show_chart(bt_fig)
+
+        if not bt['trades'].empty:
+            st.dataframe(bt['trades'], use_container_width=True)
+
+        # --- 8. PARAMETER SWEEP ---
+        with st.expander("🧪 Parameter Sweep (RSI Buy/Sell Zone × S/R Window)"):
+            sc1, sc2, sc3 = st.columns(3)
+            objective = sc1.selectbox("Objective", OBJECTIVES)
+            search = sc2.radio("Search", ["Grid", "Random"], horizontal=True)
+            n_samples = sc3.number_input("Random samples", 100, 50000, 5000, step=500, disabled=search == "Grid")
+
+            if st.button("Run sweep"):
+                st.session_state["sweep"] = get_sweep(
+                    df[['Close', 'Low', 'High', 'RSI', m_line, m_signal]], fee_pct / 100,
+                    None if search == "Grid" else int(n_samples),
+                )
+                st.session_state["sweep_key"] = (symbol, days_back, timeframe)
+
+            sweep = st.session_state.get("sweep")
+            if sweep is not None and st.session_state.get("sweep_key") == (symbol, days_back, timeframe):
+                best = best_params(sweep, objective)
+                if best is None:
+                    st.info("ไม่มีชุดพารามิเตอร์ที่เกิดการซื้อขาย")
+                else:
+                    st.write(f"**Best {objective}:** RSI Buy < {best['rsi_low']}, RSI Sell > {best['rsi_high']}, "
+                             f"S/R Window {best['sr_window']} → Sharpe {best['Sharpe']:.2f}, "
+                             f"Return {best['Total Return']:.2%}, Trades {best['Trades']:.0f}")
+                    windows = list(sweep['sr_windows'])
+                    heat_window = st.select_slider("Heatmap S/R Window", windows, value=best['sr_window'])
+                    heat = sweep['results'][objective][windows.index(heat_window)]
+                    heat_fig = go.Figure(go.Heatmap(z=heat, x=sweep['rsi_highs'], y=sweep['rsi_lows'], colorscale='Viridis', colorbar=dict(title=objective)))
+                    heat_fig.update_layout(height=500, template="plotly_dark", xaxis_title="RSI Sell Zone (Higher than)", yaxis_title="RSI Buy Zone (Lower than)")
+                    st.plotly_chart(heat_fig, use_container_width=True)
 
     else:
         st.warning("ไม่พบข้อมูล หรือข้อมูลน้อยเกินไปสำหรับการคำนวณ (ต้องใช้อย่างน้อย 30 แท่ง)")
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import random
+from datetime import datetime
+
+import pandas as pd
+
+# ตั้ง MACD_CHART_URL ชี้ไปที่ server จำลองในเครื่องเพื่อทดสอบแบบ offline
+CHART_URL = os.environ.get('MACD_CHART_URL', 'https://query1.finance.yahoo.com/v8/finance/chart/{ticker}')
+RETRY_STATUS = {429, 500, 502, 503, 504}
+INTRADAY = {'1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h'}
+
+
+def parse_chart(payload, interval='1d'):
+    # แปลง JSON ของ Yahoo chart API เป็น OHLCV หน้าตาเดียวกับ yf.download(auto_adjust=True)
+    result = (payload.get('chart') or {}).get('result') or []
+    if not result or not result[0].get('timestamp'):
+        return None
+    result = result[0]
+    quote = result['indicators']['quote'][0]
+    tz = result.get('meta', {}).get('exchangeTimezoneName') or 'UTC'
+
+    index = pd.to_datetime(result['timestamp'], unit='s', utc=True).tz_convert(tz)
+    if interval not in INTRADAY:
+        index = index.normalize().tz_localize(None)
+    df = pd.DataFrame({
+        'Open': quote.get('open'),
+        'High': quote.get('high'),
+        'Low': quote.get('low'),
+        'Close': quote.get('close'),
+        'Volume': quote.get('volume'),
+    }, index=pd.DatetimeIndex(index, name='Date'), dtype=float)
+
+    adjclose = (result['indicators'].get('adjclose') or [{}])[0].get('adjclose')
+    if adjclose is not None:
+        ratio = pd.Series(adjclose, index=df.index, dtype=float) / df['Close']
+        df[['Open', 'High', 'Low']] = df[['Open', 'High', 'Low']].mul(ratio, axis=0)
+        df['Close'] = adjclose
+
+    df = df.dropna(subset=['Close'])
+    return df[~df.index.duplicated(keep='last')]
+
+
+async def _fetch_one(session, semaphore, ticker, start, end, interval, url, retries, backoff):
+    params = {
+        'period1': int(pd.Timestamp(start).timestamp()),
+        'period2': int(pd.Timestamp(end).timestamp()),
+        'interval': interval,
+        'includeAdjustedClose': 'true',
+        'events': 'div,splits',
+    }
+    for attempt in range(retries + 1):
+        async with semaphore:
+            async with session.get(url.format(ticker=ticker), params=params) as resp:
+                if resp.status not in RETRY_STATUS or attempt == retries:
+                    resp.raise_for_status()
+                    return parse_chart(await resp.json(content_type=None), interval)
+                retry_after = resp.headers.get('Retry-After', '')
+        # ถูกจำกัด rate: รอแบบ exponential backoff (+ jitter) นอก semaphore เพื่อไม่กันคิวตัวอื่น
+        delay = float(retry_after) if retry_after.isdigit() else backoff * 2 ** attempt
+        await asyncio.sleep(delay * (1 + random.random() * 0.25))
+
+
+async def fetch_ranges(requests, interval='1d', concurrency=8, url=CHART_URL,
+                       retries=4, backoff=0.5, timeout=30):
+    # requests: dict key -> (ticker, start, end) แต่ละ ticker ขอช่วงของตัวเองได้ (end=None คือถึงปัจจุบัน)
+    # โหลดพร้อมกันโดยจำกัดจำนวน request ที่วิ่งพร้อมกันด้วย semaphore
+    # ใช้ ClientSession เดียว (connection pool) ตลอดทั้งชุด คืน dict key -> DataFrame/None/Exception
+    import aiohttp
+
+    now = datetime.now()
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    headers = {'User-Agent': 'Mozilla/5.0'}
+    async with aiohttp.ClientSession(connector=connector, headers=headers,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        results = await asyncio.gather(
+            *(_fetch_one(session, semaphore, ticker, start, end or now, interval, url, retries, backoff)
+              for ticker, start, end in requests.values()),
+            return_exceptions=True,
+        )
+    return dict(zip(requests, results))
+
+
+async def fetch_many(tickers, start, end=None, interval='1d', **kwargs):
+    # ทุก ticker ช่วงเดียวกัน คืน dict ticker -> DataFrame/None/Exception
+    return await fetch_ranges({ticker: (ticker, start, end) for ticker in tickers}, interval, **kwargs)
+
+
+def warm_store(store, tickers, start, interval='1d', now=None, **kwargs):
+    # โหลดแบบ async เฉพาะช่วงที่ store ยังขาด (BarStore.missing) แล้วใส่เข้า BarStore/DiskCache ตัวเดียวกับที่ get_data ใช้
+    # ticker ที่ไม่เคยมีโหลดทั้งช่วง, ที่สั้นไปโหลดเฉพาะหัว, ที่ท้ายหมดอายุโหลดจากแท่งที่ปิดแล้วแท่งสุดท้าย
+    # ท้ายที่ราคาถูกปรับย้อนหลังโหลดใหม่ทั้งช่วงอีกรอบ คืน dict ticker -> error ของตัวที่โหลดไม่สำเร็จ
+    now = now or datetime.now()
+    requests = {(ticker, part): (ticker, part_start, part_end or now)
+                for ticker in tickers for part, part_start, part_end in store.missing(ticker, start, interval, now=now)}
+    errors = {}
+    while requests:
+        results = asyncio.run(fetch_ranges(requests, interval, **kwargs))
+        refetch = {}
+        for (ticker, part), bars in results.items():
+            if isinstance(bars, Exception):
+                errors[ticker] = bars
+            elif bars is not None and not bars.empty:
+                if not store.put(ticker, requests[ticker, part][1], bars, interval, now=now, part=part):
+                    refetch[ticker, 'full'] = (ticker, min(pd.Timestamp(start), store.span(ticker, interval)[0]), now)
+        requests = refetch
+    return errors
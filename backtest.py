@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+
+def positions(buy, sell):
+    # 1 = ถือ, 0 = ว่าง: เข้าเมื่อเกิด Final_Buy แล้วถือจนเกิด Final_Sell (ถ้าเกิดพร้อมกัน Sell ชนะ)
+    # forward-fill เหตุการณ์ล่าสุดด้วย maximum.accumulate ไม่ต้องวนลูปทีละแท่ง
+    # รับ array หลายมิติได้ (แกนสุดท้ายคือเวลา) ใช้กับ parameter sweep ที่ broadcast หลายชุดพร้อมกัน
+    buy = np.asarray(buy, dtype=bool)
+    sell = np.asarray(sell, dtype=bool)
+    event = buy | sell
+    last = np.maximum.accumulate(np.where(event, np.arange(event.shape[-1]), -1), axis=-1)
+    state = np.take_along_axis(np.broadcast_to(buy & ~sell, event.shape), np.maximum(last, 0), axis=-1)
+    return np.where(last >= 0, state, False)
+
+
+def periods_per_year(index):
+    # นับจำนวนแท่งต่อปีจากข้อมูลจริง (หุ้น ~252, crypto ~365, intraday มากกว่านั้น)
+    if len(index) < 2 or not isinstance(index, pd.DatetimeIndex):
+        return 252.0
+    years = (index[-1] - index[0]).total_seconds() / (365.25 * 24 * 3600)
+    return (len(index) - 1) / years if years > 0 else 252.0
+
+
+def run_backtest(close, buy, sell, fee=0.001):
+    # สัญญาณเกิดตอนปิดแท่ง t -> ถือสถานะตั้งแต่ราคาปิดแท่ง t (ผลตอบแทนเริ่มนับที่แท่ง t+1)
+    # fee คิดเป็นสัดส่วนต่อการซื้อหรือขาย 1 ครั้ง
+    index = close.index
+    price = close.to_numpy(dtype=float)
+    n = len(price)
+    pos = positions(buy, sell).astype(float)
+
+    ret = np.zeros(n)
+    ret[1:] = np.nan_to_num(price[1:] / price[:-1] - 1)
+    held = np.zeros(n)
+    held[1:] = pos[:-1]
+    change = np.diff(pos, prepend=0.0)
+    strat = held * ret - np.abs(change) * fee
+
+    equity = np.cumprod(1 + strat)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    entries = np.flatnonzero(change > 0)
+    exits = np.flatnonzero(change < 0)
+    is_open = len(exits) < len(entries)
+    if is_open:
+        exits = np.append(exits, n - 1)
+    trade_ret = price[exits] / price[entries] * (1 - fee) ** 2 - 1
+    trades = pd.DataFrame({
+        'Entry': index[entries],
+        'Exit': index[exits],
+        'Entry_Price': price[entries],
+        'Exit_Price': price[exits],
+        'Return': trade_ret,
+        'Bars': exits - entries,
+        'Open': np.arange(len(entries)) == len(entries) - 1 if is_open else np.zeros(len(entries), dtype=bool),
+    })
+
+    std = strat[1:].std(ddof=1) if n > 2 else 0.0
+    stats = {
+        'Total Return': equity[-1] - 1 if n else 0.0,
+        'Buy & Hold': price[-1] / price[0] - 1 if n else 0.0,
+        'Max Drawdown': drawdown.min() if n else 0.0,
+        'Trades': len(trades),
+        'Win Rate': float((trade_ret > 0).mean()) if len(trades) else float('nan'),
+        'Sharpe': strat[1:].mean() / std * np.sqrt(periods_per_year(index)) if std > 0 else float('nan'),
+        'Exposure': pos.mean() if n else 0.0,
+    }
+    return {
+        'positions': pd.Series(pos, index=index, name='Position'),
+        'returns': pd.Series(strat, index=index, name='Return'),
+        'equity': pd.Series(equity, index=index, name='Equity'),
+        'drawdown': pd.Series(drawdown, index=index, name='Drawdown'),
+        'trades': trades,
+        'stats': stats,
+    }
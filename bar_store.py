@@ -0,0 +1,206 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from compact import compact_columns
+
+
+def yf_download(ticker, start, end=None, interval='1d'):
+    # import yfinance เมื่อโหลดจริงเท่านั้น (import ช้า และแหล่งข้อมูลอื่นไม่ต้องใช้)
+    import yfinance as yf
+
+    # ใช้ multi_level_index=False เพื่อป้องกันปัญหา Column ซ้อนกันใน yfinance รุ่นใหม่
+    return yf.download(ticker, start=start, end=end, interval=interval, multi_level_index=False, progress=False)
+
+
+def _align(ts, index):
+    # index ของ yfinance อาจมี timezone (เช่นข้อมูล intraday) ต้องปรับ ts ให้เทียบกันได้
+    tz = getattr(index, 'tz', None)
+    if tz is not None and ts.tzinfo is None:
+        return ts.tz_localize(tz)
+    return ts
+
+
+def _merge(old, new):
+    if new is None or new.empty:
+        return old
+    if old is None or old.empty:
+        return new
+    merged = pd.concat([old, new])
+    return merged[~merged.index.duplicated(keep='last')].sort_index()
+
+
+def _adjusted(old, new):
+    # แท่งที่ปิดแล้วซึ่งมีทั้งในข้อมูลเดิมและข้อมูลใหม่แต่ราคาต่างกัน = ราคาถูกปรับย้อนหลัง (split/ปันผล)
+    # ไม่นับแท่งสุดท้ายของข้อมูลเดิมเพราะอาจยังไม่ปิด
+    if old is None or old.empty or new is None or new.empty:
+        return False
+    common = old.index[:-1].intersection(new.index)
+    if common.empty:
+        return False
+    return not np.allclose(old.loc[common, 'Close'].to_numpy(dtype=float), new.loc[common, 'Close'].to_numpy(dtype=float),
+                           rtol=1e-5, equal_nan=True)
+
+
+class BarStore:
+    # เก็บแท่ง OHLCV ที่โหลดแล้วแยกตาม ticker แล้วโหลดเพิ่มเฉพาะช่วงหัว/ท้ายที่ยังขาด
+    # ช่วงที่เคยขอแล้ว (start/end) เก็บแยกจาก index ของแท่ง เพราะวันหยุดจะไม่มีแท่ง
+    # tail_ttl คืออายุของแท่งสุดท้ายที่อาจยังไม่ปิด เกินกว่านี้จะโหลดท้ายใหม่
+    # cache (DiskCache) เป็นทางเลือก ใช้เก็บข้อมูลข้ามการ restart
+    # ในหน่วยความจำเก็บไม่เกิน max_entries ตัวที่ใช้ล่าสุด (LRU) ตัวที่ถูกไล่ออกอ่านกลับจาก DiskCache แบบ memory-map
+    # และหลังเขียนลง cache จะใช้ฉบับ memory-map แทนสำเนาบน heap
+    # compact=True เก็บแท่งแบบ compact_columns (float32 เมื่อความละเอียดพอ) ตั้งแต่ตอนใส่เข้า store
+
+    def __init__(self, downloader=yf_download, cache=None, tail_ttl=timedelta(minutes=15), max_entries=256, compact=False):
+        self.downloader = downloader
+        self.compact = compact
+        self.cache = cache
+        self.tail_ttl = tail_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _fetch(self, ticker, interval, start, end):
+        data = self.downloader(ticker, start, end, interval)
+        if data is None:
+            return pd.DataFrame()
+        return data
+
+    def _remember(self, key, entry):
+        with self._guard:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _entry(self, key):
+        with self._guard:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.cache is not None:
+            entry = self.cache.load(*key)
+            if entry is not None:
+                self._remember(key, entry)
+        return entry
+
+    def _store(self, key, entry, changed=True):
+        # entry ที่แก้แล้ว: เขียนลง disk cache แล้วเก็บฉบับที่อ่านกลับแบบ memory-map แทนสำเนาบน heap
+        if changed and self.compact and not entry['bars'].empty:
+            entry['bars'] = compact_columns(entry['bars'])
+        if changed and self.cache is not None and not entry['bars'].empty and self.cache.save(*key, entry):
+            entry = self.cache.load(*key) or entry
+        self._remember(key, entry)
+        return entry
+
+    def _tail_start(self, entry):
+        # โหลดท้ายเริ่มทับแท่งที่ปิดแล้วหนึ่งแท่ง ไว้เทียบว่าราคาถูกปรับย้อนหลังหรือไม่
+        bars = entry['bars']
+        return bars.index[-min(len(bars), 2)] if not bars.empty else entry['start']
+
+    def missing(self, ticker, start, interval='1d', now=None):
+        # ช่วงที่ get() จะต้องโหลด เป็น list ของ (part, start, end): 'full' ถ้ายังไม่เคยมี, 'head' ถ้าขอย้อนไกลกว่าที่มี
+        # และ 'tail' ถ้าท้ายหมดอายุ (end=None คือถึงปัจจุบัน) ใช้กับ put(part=...) เมื่อโหลดจากทางอื่น
+        now = pd.Timestamp(now or datetime.now())
+        start = pd.Timestamp(start).normalize()
+        key = (ticker, interval)
+        with self._lock_for(key):
+            entry = self._entry(key)
+        if entry is None:
+            return [('full', start, None)]
+        parts = []
+        if start < entry['start']:
+            parts.append(('head', start, entry['start']))
+        if now - entry['end'] >= self.tail_ttl:
+            parts.append(('tail', self._tail_start(entry), None))
+        return parts
+
+    def span(self, ticker, interval='1d'):
+        # ช่วง (start, end) ที่เคยขอแล้วของ ticker นี้ ไม่มีคืน None
+        key = (ticker, interval)
+        with self._lock_for(key):
+            entry = self._entry(key)
+        return None if entry is None else (entry['start'], entry['end'])
+
+    def is_fresh(self, ticker, start, interval='1d', now=None, ttl=None):
+        # มีข้อมูลครอบคลุมตั้งแต่ start และท้ายยังไม่หมดอายุ (get() จะไม่ต้องโหลดอะไรเพิ่ม)
+        # ttl: อายุท้ายที่ยอมรับแทน tail_ttl (เช่น live ที่ต้องการท้ายใหม่กว่า)
+        now = pd.Timestamp(now or datetime.now())
+        key = (ticker, interval)
+        with self._lock_for(key):
+            entry = self._entry(key)
+        return (entry is not None and entry['start'] <= pd.Timestamp(start).normalize()
+                and now - entry['end'] < (self.tail_ttl if ttl is None else ttl))
+
+    def put(self, ticker, start, bars, interval='1d', now=None, part='full'):
+        # ใส่แท่งที่โหลดมาจากทางอื่น (เช่น async_fetch) เข้า store และ disk cache เดียวกับ get()
+        # part ตาม missing(): 'full'/'tail' คือช่วง start..now, 'head' คือช่วงหัวเท่านั้น (ไม่เลื่อนเวลาท้าย)
+        # 'tail' ที่ราคาไม่ตรงกับที่เก็บไว้ (ปรับย้อนหลัง) จะไม่ถูกใส่ คืน False ให้ผู้เรียกโหลดใหม่ทั้งช่วง
+        now = pd.Timestamp(now or datetime.now())
+        start = pd.Timestamp(start).normalize()
+        key = (ticker, interval)
+        with self._lock_for(key):
+            entry = self._entry(key)
+            if entry is None:
+                entry = {'bars': bars, 'start': start, 'end': now}
+            elif part == 'tail' and _adjusted(entry['bars'], bars):
+                return False
+            else:
+                entry['bars'] = _merge(entry['bars'], bars)
+                entry['start'] = min(entry['start'], start)
+                if part != 'head':
+                    entry['end'] = max(entry['end'], now)
+            self._store(key, entry)
+        return True
+
+    def get(self, ticker, start, interval='1d', now=None, refresh=False):
+        # refresh=True บังคับโหลดท้ายใหม่ทันที (ใช้กับโหมด live)
+        now = pd.Timestamp(now or datetime.now())
+        start = pd.Timestamp(start).normalize()
+        key = (ticker, interval)
+
+        with self._lock_for(key):
+            entry = self._entry(key)
+            changed = False
+            if entry is None:
+                entry = {'bars': self._fetch(ticker, interval, start, None), 'start': start, 'end': now}
+                changed = True
+            else:
+                # หัว: ขอย้อนหลังไกลกว่าที่เคยโหลด
+                if start < entry['start']:
+                    head = self._fetch(ticker, interval, start, entry['start'])
+                    entry['bars'] = _merge(head, entry['bars'])
+                    entry['start'] = start
+                    changed = True
+
+                # ท้าย: แท่งสุดท้ายอาจยังไม่ปิด เมื่อเกิน tail_ttl ให้โหลดซ้ำโดยเริ่มทับแท่งที่ปิดแล้วหนึ่งแท่ง
+                # ถ้าแท่งที่ทับราคาไม่ตรงกับที่เก็บไว้ (Yahoo ปรับราคาย้อนหลัง) ข้อมูลเดิมใช้ต่อไม่ได้ โหลดใหม่ทั้งช่วง
+                if refresh or now - entry['end'] >= self.tail_ttl:
+                    bars = entry['bars']
+                    tail = self._fetch(ticker, interval, self._tail_start(entry), None)
+                    if not _adjusted(bars, tail):
+                        entry['bars'] = _merge(bars, tail)
+                        entry['end'] = now
+                    else:
+                        full = self._fetch(ticker, interval, entry['start'], None)
+                        if not full.empty:
+                            entry['bars'] = full
+                            entry['end'] = now
+                    changed = True
+
+            bars = self._store(key, entry, changed)['bars']
+
+        if bars.empty:
+            return None
+        window = bars[bars.index >= _align(start, bars.index)]
+        if window.empty:
+            return None
+        return window.copy()
@@ -0,0 +1,263 @@
+import argparse
+import copy
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+from synthetic import synthetic_ohlcv
+
+STAGES = ['data', 'indicators', 'sr', 'patterns', 'decision', 'backtest', 'chart']
+PACKAGES = ['numpy', 'numba', 'pandas', 'pandas_ta', 'plotly', 'yfinance', 'pyarrow']
+
+
+def _versions():
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+class _Timer:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+
+    def __call__(self, name, func, setup=None):
+        # setup() เตรียม input ใหม่ทุกรอบ (ไม่นับเวลา) ใช้กับขั้นที่มีสถานะ เช่น engine แบบ incremental
+        times = []
+        value = None
+        for _ in range(self.repeat):
+            arg = setup() if setup is not None else None
+            start = time.perf_counter()
+            value = func(arg) if setup is not None else func()
+            times.append(time.perf_counter() - start)
+        self.results[name] = {'min_s': min(times), 'median_s': statistics.median(times)}
+        print(f"  {name:<28} min {min(times) * 1000:10.2f} ms   median {statistics.median(times) * 1000:10.2f} ms")
+        return value
+
+
+def _check(name, expected, actual, tolerance=1e-8):
+    # เทียบผล kernel กับ pandas_ta/pandas (NaN ต้องอยู่ตำแหน่งเดียวกัน)
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    same_nan = np.array_equal(np.isnan(expected), np.isnan(actual))
+    diff = np.nanmax(np.abs(expected - actual)) if (~np.isnan(expected)).any() else 0.0
+    status = 'ok' if same_nan and diff <= tolerance else 'MISMATCH'
+    print(f"  {name:<28} max |diff| {diff:.3g}{'' if same_nan else ' (NaN positions differ)'}   {status}")
+
+
+def _check_tick(name, make_stream, columns, short=1_000, repeat=5, tolerance=3.0):
+    # เวลา sync หนึ่งแท่งใหม่ต้องไม่โตตามความยาว series: เทียบ series เต็มกับ short แท่งแรก
+    def tick(length):
+        head = make_stream()
+        head.sync(*(c.iloc[:length - 1] for c in columns))
+        times = []
+        for _ in range(repeat):
+            stream = copy.deepcopy(head)
+            start = time.perf_counter()
+            stream.sync(*(c.iloc[:length] for c in columns))
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    n = len(columns[0])
+    if n <= short:
+        return
+    ratio = tick(n) / tick(short)
+    status = 'ok' if ratio <= tolerance else 'SCALES WITH n'
+    print(f"  {name:<28} tick {n} bars / {short} bars = {ratio:.2f}x   {status}")
+
+
+def run(bars, repeat=3, stages=STAGES, sr_window=20, rsi_low=40, rsi_high=65):
+    # จับเวลาแต่ละขั้นของ app.py บนข้อมูลสังเคราะห์ bars แท่ง (ไม่ใช้ network)
+    data = synthetic_ohlcv(bars)
+    close = data['Close']
+    timer = _Timer(repeat)
+    print(f"bars={bars:,}")
+
+    if 'data' in stages:
+        from bar_store import BarStore
+
+        def stub(ticker, start, end=None, interval='1d'):
+            return data.loc[pd.Timestamp(start):pd.Timestamp(end) if end is not None else None]
+
+        def primed():
+            # store ที่มีข้อมูลครึ่งหลังอยู่แล้ว
+            store = BarStore(downloader=stub)
+            store.get('SYN', middle, now=now)
+            return store
+
+        start, middle, now = data.index[0], data.index[len(data) // 2], data.index[-1]
+        timer('get_data.cold', lambda: BarStore(downloader=stub).get('SYN', start, now=now))
+        store = primed()
+        timer('get_data.warm', lambda: store.get('SYN', middle, now=now))
+        timer('get_data.extend_head', lambda s: s.get('SYN', start, now=now), setup=primed)
+
+    df = data.copy()
+    if {'indicators', 'patterns'} & set(stages):
+        # ตัวอ้างอิงของ kernel (import ช้า จึง import เฉพาะเมื่อมีขั้นที่ใช้)
+        import pandas_ta as ta
+
+    if {'indicators', 'decision', 'backtest', 'chart'} & set(stages):
+        from indicators import IndicatorStream
+
+        if 'indicators' in stages:
+            import kernels
+
+            ta_macd = timer('macd.pandas_ta', lambda: ta.macd(close))
+            ta_rsi = timer('rsi.pandas_ta', lambda: ta.rsi(close, length=14))
+            # รอบแรกของ numba รวมเวลา compile ด้วย จึงเรียกก่อนหนึ่งครั้ง
+            kernels.macd(close.to_numpy()[:100])
+            k_macd = timer('macd.kernel', lambda: kernels.macd(close.to_numpy()))
+            k_rsi = timer('rsi.kernel', lambda: kernels.rsi(close.to_numpy(), 14))
+            _check('macd.kernel', ta_macd.to_numpy(), np.column_stack(k_macd))
+            _check('rsi.kernel', ta_rsi.to_numpy(), k_rsi)
+            head = IndicatorStream()
+            head.sync(close.iloc[:-1])
+            timer('indicators.engine_tick', lambda s: s.sync(close), setup=lambda: copy.deepcopy(head))
+            _check_tick('indicators.engine_tick', IndicatorStream, [close])
+        indicators = timer('indicators.engine_full', lambda: IndicatorStream().sync(close))
+        df = pd.concat([df, indicators], axis=1)
+        m_line, m_signal = indicators.columns[0], indicators.columns[2]
+        df['RSI'] = indicators.iloc[:, 3]
+
+    if {'sr', 'decision', 'backtest', 'chart'} & set(stages):
+        from support_resistance import SRTable
+
+        if 'sr' in stages:
+            import kernels
+
+            rolled = timer('sr.rolling_single', lambda: (df['Low'].rolling(window=sr_window).min(),
+                                                         df['High'].rolling(window=sr_window).max()))
+            kernels.rolling_min(df['Low'].to_numpy()[:100], sr_window)
+            k_rolled = timer('sr.kernel', lambda: (kernels.rolling_min(df['Low'].to_numpy(), sr_window),
+                                                   kernels.rolling_max(df['High'].to_numpy(), sr_window)))
+            _check('sr.kernel', np.column_stack([r.to_numpy() for r in rolled]), np.column_stack(k_rolled))
+
+            # live: S/R แบบ streaming (monotonic deque) รับแท่งใหม่หนึ่งแท่งต่อจากสถานะเดิม
+            from indicators import IndicatorStream
+
+            head = IndicatorStream(sr_window=sr_window)
+            head.sync(df['Close'].iloc[:-1], df['Low'].iloc[:-1], df['High'].iloc[:-1])
+            timer('sr.stream_tick', lambda s: s.sync(df['Close'], df['Low'], df['High']), setup=lambda: copy.deepcopy(head))
+            streamed = IndicatorStream(sr_window=sr_window).sync(df['Close'], df['Low'], df['High'])
+            _check('sr.stream', np.column_stack([r.to_numpy() for r in rolled]), streamed[['Support', 'Resistance']].to_numpy())
+            _check_tick('sr.stream_tick', lambda: IndicatorStream(sr_window=sr_window), [df['Close'], df['Low'], df['High']])
+        table = timer('sr.table_all_windows', lambda: SRTable(df['Low'], df['High']))
+        df['Support'], df['Resistance'] = table.get(sr_window)
+
+    if 'patterns' in stages:
+        from strategy import engulfing
+
+        timer('patterns.cdl_pattern', lambda: ta.cdl_pattern(df['Open'], df['High'], df['Low'], df['Close'], name="engulfing"))
+        timer('patterns.engulfing', lambda: engulfing(df['Open'], df['Close'], df['Open'].shift(1), df['Close'].shift(1)))
+
+        import kernels
+
+        kernels.engulfing(df['Open'].to_numpy()[:100], df['Close'].to_numpy()[:100])
+        timer('patterns.kernel', lambda: kernels.engulfing(df['Open'].to_numpy(), df['Close'].to_numpy()))
+
+    if {'decision', 'backtest', 'chart'} & set(stages):
+        from strategy import evaluate_conditions
+
+        cond = timer('decision', lambda: evaluate_conditions(
+            df['Low'], df['High'], df['Support'], df['Resistance'],
+            df['RSI'], df['RSI'].shift(1), df[m_line], df[m_line].shift(1), df[m_signal], df[m_signal].shift(1),
+            rsi_low, rsi_high,
+        ))
+        df['Final_Buy'], df['Final_Sell'] = cond['Final_Buy'], cond['Final_Sell']
+
+        if 'decision' in stages:
+            import kernels
+
+            args = (df['Low'], df['High'], df['Support'], df['Resistance'], df['RSI'], df[m_line], df[m_signal], rsi_low, rsi_high)
+            kernels.decide(*(a[:100] for a in args[:7]), rsi_low, rsi_high)
+            fused = timer('decision.kernel', lambda: kernels.decide(*args))
+            _check('decision.kernel', np.column_stack([cond[c] for c in kernels.DECISION_COLUMNS]),
+                   np.column_stack([fused[c] for c in kernels.DECISION_COLUMNS]))
+
+    if 'backtest' in stages:
+        from backtest import run_backtest
+
+        timer('backtest', lambda: run_backtest(df['Close'], df['Final_Buy'], df['Final_Sell']))
+
+    if 'chart' in stages:
+        import plotly.graph_objects as go
+
+        from charts import add_signal_layers, base_figure, figure_payload
+
+        base = timer('chart.base_figure', lambda: base_figure(df, m_line, m_signal))
+        fig = timer('chart.signal_layers', lambda: add_signal_layers(go.Figure(base), df, rsi_low, rsi_high))
+        # ขนาดที่ส่งไป browser: JSON ของ st.plotly_chart เทียบกับแบบ columnar (แกน x ร่วม + typed array)
+        as_json = timer('chart.payload_json', lambda: fig.to_json())
+        columnar = timer('chart.payload_columnar', lambda: figure_payload(fig))
+        print(f"  {'chart.payload_size':<28} json {len(as_json) / 1e6:.2f} MB   columnar {len(columnar) / 1e6:.2f} MB")
+
+    return timer.results
+
+
+def _latest(path):
+    # ผลล่าสุดของแต่ละ (bars, stage) ในไฟล์ผล benchmark
+    latest = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                latest[(record['bars'], record['stage'])] = record
+    return latest
+
+
+def compare(records, baseline_path, tolerance):
+    baseline = _latest(baseline_path)
+    regressions = []
+    print(f"\ncompare with {baseline_path} (tolerance x{tolerance:.2f})")
+    for record in records:
+        base = baseline.get((record['bars'], record['stage']))
+        if base is None:
+            continue
+        ratio = record['min_s'] / base['min_s'] if base['min_s'] > 0 else float('inf')
+        flag = 'REGRESSION' if ratio > tolerance else ''
+        print(f"  bars={record['bars']:<10,} {record['stage']:<28} x{ratio:6.2f} {flag}")
+        if flag:
+            regressions.append(record)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the data, indicator, decision and chart stages offline.")
+    parser.add_argument('--bars', type=int, nargs='+', default=[1_000, 100_000],
+                        help="synthetic series lengths, e.g. 1000 100000 10000000")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--out', default='bench_results.jsonl', help="append results to this JSON Lines file")
+    parser.add_argument('--compare', metavar='BASELINE', help="results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help="slowdown ratio that counts as a regression")
+    args = parser.parse_args(argv)
+
+    stamp = datetime.now().isoformat(timespec='seconds')
+    versions = _versions()
+    records = []
+    for bars in args.bars:
+        for stage, result in run(bars, args.repeat, args.stages).items():
+            records.append({'timestamp': stamp, 'bars': bars, 'stage': stage, 'repeat': args.repeat,
+                            **result, 'versions': versions})
+
+    regressions = compare(records, args.compare, args.tolerance) if args.compare else []
+    with open(args.out, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    print(f"\nwrote {len(records)} results to {args.out}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
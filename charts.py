@@ -0,0 +1,217 @@
+import base64
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from compact import fits_float32
+
+DOWNSAMPLE_METHODS = ['minmax', 'lttb']
+
+
+def minmax_indices(y, n_out):
+    # แบ่งเป็น n_out/2 ช่วงเท่าๆ กัน เก็บจุดต่ำสุดและสูงสุดของแต่ละช่วง (ยอด/ก้นไม่หาย) ทำแบบ vectorized
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    k = int(np.ceil(n / max(n_out // 2, 1)))
+    m = int(np.ceil(n / k))
+    blocks = np.full(m * k, np.nan)
+    blocks[:n] = y
+    blocks = blocks.reshape(m, k)
+    nan = np.isnan(blocks)
+    base = np.arange(m) * k
+    lo = base + np.where(nan, np.inf, blocks).argmin(axis=1)
+    hi = base + np.where(nan, -np.inf, blocks).argmax(axis=1)
+    idx = np.unique(np.concatenate([lo, hi, [0, n - 1]]))
+    return idx[idx < n]
+
+
+def lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: เลือกจุดที่สร้างสามเหลี่ยมใหญ่สุดกับจุดก่อนหน้าและค่าเฉลี่ยช่วงถัดไป
+    # ข้ามจุด NaN (เช่นช่วงต้นของ MACD/RSI)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = np.flatnonzero(~np.isnan(y))
+    x, y = x[valid], y[valid]
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return valid
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return valid[selected]
+
+
+def aggregate_ohlc(df, n_out):
+    # รวมแท่งติดกันให้เหลือไม่เกิน n_out แท่ง: Open แรก, High สูงสุด, Low ต่ำสุด, Close สุดท้าย
+    n = len(df)
+    if n <= n_out:
+        return df[['Open', 'High', 'Low', 'Close']]
+    starts = np.unique(np.linspace(0, n, n_out + 1).astype(int)[:-1])
+    ends = np.append(starts[1:], n) - 1
+    return pd.DataFrame({
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.fmax.reduceat(df['High'].to_numpy(dtype=float), starts),
+        'Low': np.fmin.reduceat(df['Low'].to_numpy(dtype=float), starts),
+        'Close': df['Close'].to_numpy()[ends],
+    }, index=df.index[starts])
+
+
+def _downsample(series, max_points, method):
+    if not max_points or len(series) <= max_points:
+        return series.index, series.to_numpy()
+    if method == 'lttb':
+        idx = lttb_indices(series.index.as_unit('ms').asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series)),
+                           series.to_numpy(), max_points)
+    else:
+        idx = minmax_indices(series.to_numpy(), max_points)
+    return series.index[idx], series.to_numpy()[idx]
+
+
+def base_figure(df, m_line, m_signal, max_points=None, webgl=False, method='minmax'):
+    # ส่วนของกราฟที่ไม่ขึ้นกับ RSI threshold: แท่งเทียน, S/R, MACD, RSI
+    # สร้างครั้งเดียวต่อข้อมูล + S/R window แล้ว cache ไว้ ส่วนที่เปลี่ยนตาม threshold เติมด้วย add_signal_layers
+    # max_points: ลดจำนวนจุดฝั่ง server (รวมแท่งเทียน + minmax/LTTB ของเส้น) ให้พอดีความกว้างกราฟ
+    # webgl: ใช้ Scattergl แทน Scatter สำหรับข้อมูลยาวๆ
+    # plotly import ช้า จึง import เมื่อสร้างกราฟครั้งแรก (โหมด Scanner ไม่ต้องใช้เลย)
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    scatter = go.Scattergl if webgl else go.Scatter
+    fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.5, 0.25, 0.25])
+
+    def line(column, row, name, **style):
+        x, y = _downsample(df[column], max_points, method)
+        fig.add_trace(scatter(x=x, y=y, line=style, name=name), row=row, col=1)
+
+    # Price Chart
+    candles = aggregate_ohlc(df, max_points) if max_points else df
+    fig.add_trace(go.Candlestick(x=candles.index, open=candles['Open'], high=candles['High'], low=candles['Low'], close=candles['Close'], name="Price"), row=1, col=1)
+    line('Support', 1, 'Support', color='green', dash='dot', width=1)
+    line('Resistance', 1, 'Resistance', color='red', dash='dot', width=1)
+
+    # MACD
+    line(m_line, 2, 'MACD', color='cyan')
+    line(m_signal, 2, 'Signal', color='orange')
+
+    # RSI
+    line('RSI', 3, 'RSI', color='magenta')
+
+    fig.update_layout(height=800, template="plotly_dark", xaxis_rangeslider_visible=False)
+    return fig
+
+
+def add_signal_layers(fig, df, rsi_low, rsi_high, buy=None, sell=None):
+    # Buy/Sell Markers และเส้น RSI threshold (ขึ้นกับ decision logic) marker มีไม่กี่จุดจึงไม่ต้องลดจุด
+    # buy/sell: bool array แทนคอลัมน์ Final_Buy/Final_Sell (เช่นเมื่อเก็บแบบ PackedFlags)
+    import plotly.graph_objects as go
+
+    buy = df['Final_Buy'].to_numpy(dtype=bool) if buy is None else buy
+    sell = df['Final_Sell'].to_numpy(dtype=bool) if sell is None else sell
+    if buy.any():
+        fig.add_trace(go.Scatter(x=df.index[buy], y=df['Low'].to_numpy()[buy] * 0.98, mode='markers', marker=dict(symbol='triangle-up', size=15, color='#00FF00'), name='ENTRY'), row=1, col=1)
+    if sell.any():
+        fig.add_trace(go.Scatter(x=df.index[sell], y=df['High'].to_numpy()[sell] * 1.02, mode='markers', marker=dict(symbol='triangle-down', size=15, color='#FF0000'), name='EXIT'), row=1, col=1)
+
+    fig.add_hline(y=rsi_high, line_dash="dash", line_color="red", row=3, col=1)
+    fig.add_hline(y=rsi_low, line_dash="dash", line_color="green", row=3, col=1)
+    return fig
+
+
+# --- ส่งกราฟแบบ columnar ---
+# st.plotly_chart ส่งทุก trace เป็น JSON list (แกน x วันที่ซ้ำทุก trace ราว 9 ชุด) แบบนี้แกนที่ค่าเหมือนกัน
+# ถูกส่งครั้งเดียวแล้วทุก trace อ้างถึงคอลัมน์เดียวกัน และตัวเลขส่งเป็น binary (base64 ของ typed array)
+TRANSPORTS = ['Plotly JSON', 'Columnar (binary)']
+PLOTLY_JS = os.environ.get('MACD_PLOTLY_JS', 'https://cdn.plot.ly/plotly-{version}.min.js')
+
+
+def _column(values):
+    # คืน (array, เป็นเวลาหรือไม่) เฉพาะข้อมูลตัวเลข/เวลา ไม่งั้น None (เช่น ข้อความ, bool)
+    if not isinstance(values, (np.ndarray, pd.Index, pd.Series, list, tuple)) or len(values) < 2:
+        return None
+    array = np.asarray(values)
+    if array.ndim != 1:
+        return None
+    if array.dtype.kind in 'iuf':
+        return array.astype(float), False
+    if array.dtype.kind == 'M' or (array.dtype.kind == 'O' and isinstance(array[0], (datetime, np.datetime64))):
+        try:
+            index = pd.DatetimeIndex(array)
+        except (TypeError, ValueError):
+            return None
+        # แกนวันที่ของ Plotly รับเลข ms ตั้งแต่ epoch แสดงเป็นเวลาท้องถิ่นของข้อมูล (เหมือนกับส่งเป็น ISO string)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        # หน่วยของ index อาจเป็น ns/us/s (ขึ้นกับ pandas และแหล่งข้อมูล) จึงแปลงเป็น ms ก่อน
+        return np.where(index.isna(), np.nan, index.as_unit('ms').asi8), True
+    return None
+
+
+def figure_payload(fig):
+    # fig -> JSON string: {'columns': [typed array], 'traces': [trace ที่ค่า array ถูกแทนด้วย refs], 'layout'}
+    # ราคา/ตัวชี้วัดส่งเป็น float32 เมื่อความละเอียดพอ (compact.fits_float32) ส่วนเวลาใช้ float64 เสมอ
+    from plotly.utils import PlotlyJSONEncoder
+
+    columns, seen = [], {}
+    traces = []
+    layout = fig.layout.to_plotly_json()
+    for trace in fig.data:
+        spec = trace.to_plotly_json()
+        refs = {}
+        for key, values in list(spec.items()):
+            column = _column(values)
+            if column is None:
+                continue
+            array, is_date = column
+            dtype = 'f4' if not is_date and fits_float32(array) else 'f8'
+            data = array.astype('<' + dtype).tobytes()
+            digest = (dtype, hashlib.blake2b(data, digest_size=16).digest())
+            if digest not in seen:
+                seen[digest] = len(columns)
+                columns.append({'dtype': dtype, 'bdata': base64.b64encode(data).decode('ascii')})
+            refs[key] = seen[digest]
+            del spec[key]
+            if is_date and key == 'x':
+                axis = 'xaxis' + spec.get('xaxis', 'x')[1:]
+                layout.setdefault(axis, {}).setdefault('type', 'date')
+        spec['refs'] = refs
+        traces.append(spec)
+    return json.dumps({'columns': columns, 'traces': traces, 'layout': layout}, cls=PlotlyJSONEncoder)
+
+
+def columnar_html(fig):
+    # หน้า HTML สำหรับ st.components.v1.html: ถอด base64 เป็น Float32Array/Float64Array แล้ว Plotly.newPlot
+    # plotly.js โหลดจาก CDN ตามเวอร์ชันของ plotly.py (browser cache ไว้) ตั้ง MACD_PLOTLY_JS ถ้าใช้ไฟล์ภายใน
+    from plotly.offline import get_plotlyjs_version
+
+    payload = figure_payload(fig).replace('</', '<\\/')
+    return f"""<div id="chart" style="width:100%;height:{fig.layout.height or 450}px"></div>
+<script src="{PLOTLY_JS.format(version=get_plotlyjs_version())}"></script>
+<script>
+const payload = {payload};
+const columns = payload.columns.map(c => {{
+  const raw = atob(c.bdata), bytes = new Uint8Array(raw.length);
+  for (let i = 0; i < raw.length; i++) bytes[i] = raw.charCodeAt(i);
+  return c.dtype === 'f4' ? new Float32Array(bytes.buffer) : new Float64Array(bytes.buffer);
+}});
+const traces = payload.traces.map(t => {{
+  for (const [key, i] of Object.entries(t.refs)) t[key] = columns[i];
+  delete t.refs;
+  return t;
+}});
+Plotly.newPlot('chart', traces, payload.layout, {{responsive: true}});
+</script>"""
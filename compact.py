@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+FLAG_COLUMNS = ['RSI_Up', 'Bullish_Engulfing', 'Bearish_Engulfing', 'Final_Buy', 'Final_Sell']
+
+
+def fits_float32(values, decimals=2):
+    # float32 เก็บได้ราว 7 หลัก: ใช้ได้ถ้าทุกค่ายังถูกต้องถึงทศนิยม decimals ตำแหน่ง
+    # (เช่นราคาไม่เกิน ~130,000 ที่ความละเอียดระดับสตางค์/เซนต์) ไม่งั้นคง float64 ไว้
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(over='ignore', invalid='ignore'):
+        error = np.abs(values.astype(np.float32).astype(np.float64) - values)
+    return not (error > 0.5 * 10.0 ** -decimals).any()
+
+
+class PackedFlags:
+    # คอลัมน์ bool หลายคอลัมน์เก็บเป็น bit (8 แท่งต่อ byte) ด้วย np.packbits แทน bool 1 byte ต่อแท่ง
+    # อ่านทั้งคอลัมน์ด้วย flags[name] หรืออ่านแท่งเดียวด้วย flags.at(name, i) โดยไม่ unpack ทั้งคอลัมน์
+
+    def __init__(self, columns, length):
+        self.length = length
+        self._bits = {name: np.packbits(np.asarray(values, dtype=bool)) for name, values in columns.items()}
+
+    def __contains__(self, name):
+        return name in self._bits
+
+    def __getitem__(self, name):
+        return np.unpackbits(self._bits[name], count=self.length).astype(bool)
+
+    def at(self, name, i):
+        i = i % self.length
+        return bool((self._bits[name][i >> 3] >> (7 - (i & 7))) & 1)
+
+    @property
+    def nbytes(self):
+        return sum(bits.nbytes for bits in self._bits.values())
+
+
+def compact_columns(df, decimals=2):
+    # ราคา/ตัวชี้วัดเป็น float32 เมื่อความละเอียดพอ, Volume เป็น int ที่เล็กที่สุดที่พอ คอลัมน์อื่นคงเดิม
+    # ใช้กับข้อมูลที่ถูกเก็บไว้นาน (BarStore, cache ข้าม session) ส่วนการตัดสินใจยังคำนวณจาก float64
+    columns = {}
+    for name in df.columns:
+        values = df[name]
+        if name == 'Volume' and values.notna().all() and (values % 1 == 0).all():
+            columns[name] = pd.to_numeric(values.astype(np.int64), downcast='unsigned' if (values >= 0).all() else 'integer')
+        elif values.dtype == np.float64 and fits_float32(values.to_numpy(), decimals):
+            columns[name] = values.astype(np.float32)
+        else:
+            columns[name] = values
+    return pd.DataFrame(columns, index=df.index)
+
+
+def compact_frame(df, flag_columns=FLAG_COLUMNS, extra_flags=None, decimals=2):
+    # คืน (df, flags): compact_columns และย้ายคอลัมน์ bool ออกไปเก็บแบบ bit ใน PackedFlags
+    # (รวม extra_flags เช่นเงื่อนไขของ checklist)
+    flags = {name: df[name].to_numpy() for name in flag_columns if name in df.columns}
+    flags.update(extra_flags or {})
+    df = df.drop(columns=[name for name in flags if name in df.columns])
+    return compact_columns(df, decimals), PackedFlags(flags, len(df))
@@ -0,0 +1,86 @@
+import glob
+import os
+import threading
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+
+
+def evict_lru(root, max_bytes, keep=None):
+    # ลบไฟล์ *.arrow ใน root ที่ไม่ได้ใช้นานที่สุดก่อน (LRU ตาม mtime) จนขนาดรวมไม่เกิน max_bytes ยกเว้น keep
+    # ผู้เรียกต้องกัน thread อื่นใน process เดียวกันเอง
+    files = []
+    for path in glob.glob(os.path.join(root, '*.arrow')):
+        try:
+            files.append((os.path.getmtime(path), os.path.getsize(path), path))
+        except OSError:
+            continue
+
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
+
+
+class DiskCache:
+    # แคชแท่ง OHLCV ลงดิสก์เป็นไฟล์ Arrow IPC ต่อ ticker/interval และอ่านกลับแบบ memory-map
+    # ทำให้ restart แล้วไม่ต้องโหลดจาก yfinance ใหม่ทั้งหมด
+    # ถ้าขนาดรวมเกิน max_bytes จะลบไฟล์ที่ไม่ได้ใช้นานที่สุดก่อน (LRU ตาม mtime)
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, ticker, interval):
+        return os.path.join(self.root, f"{quote(ticker, safe='')}_{interval}.arrow")
+
+    def load(self, ticker, interval):
+        path = self._path(ticker, interval)
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+            os.utime(path)
+        except (OSError, pa.ArrowException):
+            return None
+
+        meta = table.schema.metadata or {}
+        if b'start' not in meta or b'end' not in meta:
+            return None
+        # split_blocks ทำให้คอลัมน์ตัวเลขชี้ไปที่ buffer ของไฟล์โดยตรง ไม่คัดลอกขึ้น heap
+        return {
+            'bars': table.to_pandas(split_blocks=True),
+            'start': pd.Timestamp(meta[b'start'].decode()),
+            'end': pd.Timestamp(meta[b'end'].decode()),
+        }
+
+    def save(self, ticker, interval, entry):
+        path = self._path(ticker, interval)
+        tmp = path + '.tmp'
+        try:
+            table = pa.Table.from_pandas(entry['bars'])
+            meta = dict(table.schema.metadata or {})
+            meta[b'start'] = entry['start'].isoformat().encode()
+            meta[b'end'] = entry['end'].isoformat().encode()
+            table = table.replace_schema_metadata(meta)
+
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        except (OSError, pa.ArrowException):
+            return False
+        self._evict(keep=path)
+        return True
+
+    def _evict(self, keep):
+        with self._lock:
+            evict_lru(self.root, self.max_bytes, keep)
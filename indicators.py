@@ -0,0 +1,285 @@
+import copy
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import kernels
+
+NAN = float('nan')
+
+
+class _EWM:
+    # Series.ewm().mean() แบบทีละค่า ใช้สูตรเดียวกับ pandas (adjust / min_periods) ผลจึงตรงกับแบบ batch
+
+    def __init__(self, alpha, adjust, min_periods=0):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x):
+        is_obs = x == x
+        self.nobs += is_obs
+        if self.weighted == self.weighted:
+            self.old_wt *= 1.0 - self.alpha
+            if is_obs:
+                new_wt = 1.0 if self.adjust else self.alpha
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + new_wt * x) / (self.old_wt + new_wt)
+                self.old_wt = self.old_wt + new_wt if self.adjust else 1.0
+        elif is_obs:
+            self.weighted = x
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+    def load(self, x):
+        # สถานะเดียวกับ update ทุกค่าใน x (ไม่มี NaN) แบบ vectorized: น้ำหนัก (1 - alpha)^(ระยะห่างจากท้าย)
+        self.nobs = len(x)
+        if not len(x):
+            return
+        decay = (1.0 - self.alpha) ** np.arange(len(x) - 1, -1, -1)
+        if self.adjust:
+            self.old_wt = float(decay.sum())
+            self.weighted = float((decay * x).sum() / self.old_wt)
+        else:
+            weights = self.alpha * decay
+            weights[0] = decay[0]
+            self.old_wt = 1.0
+            self.weighted = float((weights * x).sum())
+
+
+class _SeededEMA:
+    # ta.ema ของ pandas_ta: ค่าแรกคือ SMA ของ length แท่งแรก จากนั้นเป็น ewm(span=length, adjust=False)
+
+    def __init__(self, length):
+        self.length = length
+        self.count = 0
+        self.total = 0.0
+        self.ewm = _EWM(2.0 / (length + 1), adjust=False)
+
+    def update(self, x):
+        if self.count < self.length:
+            self.count += 1
+            self.total += x
+            if self.count < self.length:
+                return NAN
+            x = self.total / self.length
+        return self.ewm.update(x)
+
+    def load(self, x):
+        self.count = min(len(x), self.length)
+        self.total = float(x[:self.length].sum())
+        if len(x) >= self.length:
+            self.ewm.load(np.concatenate([[self.total / self.length], x[self.length:]]))
+
+
+class MACDState:
+    # ta.macd: signal คือ EMA ของเส้น MACD นับจากแท่งแรกที่ MACD มีค่า
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = _SeededEMA(fast)
+        self.slow = _SeededEMA(slow)
+        self.signal = _SeededEMA(signal)
+
+    def update(self, close):
+        macd = self.fast.update(close) - self.slow.update(close)
+        if macd != macd:
+            return NAN, NAN, NAN
+        signal = self.signal.update(macd)
+        return macd, macd - signal, signal
+
+    def load(self, close, line):
+        # line: เส้น MACD ของ close ทั้งชุด (signal เริ่มนับจากแท่งแรกที่ MACD มีค่า)
+        self.fast.load(close)
+        self.slow.load(close)
+        self.signal.load(line[~np.isnan(line)])
+
+
+class RSIState:
+    # ta.rsi: ค่าเฉลี่ยกำไร/ขาดทุนแบบ Wilder (rma = ewm(alpha=1/length, min_periods=length))
+
+    def __init__(self, length=14, scalar=100):
+        self.length = length
+        self.scalar = scalar
+        self.gain = _EWM(1.0 / length, adjust=True, min_periods=length)
+        self.loss = _EWM(1.0 / length, adjust=True, min_periods=length)
+        self.prev = NAN
+
+    def update(self, close):
+        diff = close - self.prev
+        self.prev = close
+        avg_gain = self.gain.update(0.0 if diff < 0 else diff)
+        avg_loss = abs(self.loss.update(0.0 if diff > 0 else diff))
+        total = avg_gain + avg_loss
+        if total != total or total == 0:
+            return NAN
+        return self.scalar * avg_gain / total
+
+    def load(self, close):
+        # แท่งแรกไม่มีผลต่าง (NaN) จึงไม่นับเป็น observation เหมือน update
+        diff = np.diff(close)
+        self.gain.load(np.where(diff < 0, 0.0, diff))
+        self.loss.load(np.where(diff > 0, 0.0, diff))
+        self.prev = float(close[-1]) if len(close) else NAN
+
+
+class RollingExtremum:
+    # Series.rolling(window).min()/max() แบบทีละค่าด้วย monotonic deque: เก็บเฉพาะค่าที่ยังอาจเป็นคำตอบ
+    # (index, ค่า) เรียงแบบ monotonic ค่าหน้าสุดคือคำตอบ แต่ละค่าเข้า/ออก deque ครั้งเดียวจึงเป็น amortized O(1)
+    # เหมือน pandas: ยังไม่ครบ window หรือมี NaN ใน window ให้ผล NaN
+
+    def __init__(self, window, is_max=False):
+        self.window = window
+        self.is_max = is_max
+        self.count = 0
+        self.last_nan = -window
+        self.items = deque()
+
+    def update(self, x):
+        i = self.count
+        self.count += 1
+        if x != x:
+            self.last_nan = i
+        else:
+            items = self.items
+            while items and (items[-1][1] <= x if self.is_max else items[-1][1] >= x):
+                items.pop()
+            items.append((i, x))
+        while self.items and self.items[0][0] <= i - self.window:
+            self.items.popleft()
+        if i + 1 < self.window or i - self.last_nan < self.window:
+            return NAN
+        return self.items[0][1]
+
+    def load(self, x):
+        # deque ขึ้นกับ window ค่าสุดท้ายเท่านั้น: เลื่อนตัวนับไปแล้วป้อนเฉพาะช่วงนั้น
+        self.count = max(len(x) - self.window, 0)
+        self.last_nan = self.count - self.window
+        self.items.clear()
+        for value in x[-self.window:]:
+            self.update(value)
+
+
+class SRState:
+    # Support = rolling min ของ Low, Resistance = rolling max ของ High (window = sr_window)
+
+    def __init__(self, window=20):
+        self.support = RollingExtremum(window)
+        self.resistance = RollingExtremum(window, is_max=True)
+
+    def update(self, low, high):
+        return self.support.update(low), self.resistance.update(high)
+
+    def load(self, low, high):
+        self.support.load(low)
+        self.resistance.load(high)
+
+
+class IndicatorEngine:
+    # เก็บสถานะ MACD/RSI แล้วเดินหน้าทีละแท่งแบบ O(1) ชื่อคอลัมน์ตรงกับ pandas_ta
+    # sr_window: เพิ่มคอลัมน์ Support/Resistance (ต้องส่ง low/high ให้ update) สถานะ S/R อยู่ใน snapshot ด้วย
+
+    def __init__(self, fast=12, slow=26, signal=9, rsi_length=14, sr_window=None):
+        self.macd = MACDState(fast, slow, signal)
+        self.rsi = RSIState(rsi_length)
+        self.sr = SRState(sr_window) if sr_window else None
+        self.columns = [
+            f"MACD_{fast}_{slow}_{signal}",
+            f"MACDh_{fast}_{slow}_{signal}",
+            f"MACDs_{fast}_{slow}_{signal}",
+            f"RSI_{rsi_length}",
+        ] + (['Support', 'Resistance'] if self.sr else [])
+
+    def update(self, close, low=NAN, high=NAN):
+        if self.sr is None:
+            return (*self.macd.update(close), self.rsi.update(close))
+        return (*self.macd.update(close), self.rsi.update(close), *self.sr.update(low, high))
+
+    def load(self, close, low=None, high=None):
+        # ผลเหมือน update ทีละแท่งทั้งชุด แต่คำนวณด้วย kernels (vectorized) แล้วตั้งสถานะจากค่าท้ายๆ
+        # ใช้ตอนเริ่มใหม่ทั้งชุด (session ใหม่/เปลี่ยน Lookback/timeframe) close ต้องไม่มี NaN คืน array (แท่ง, คอลัมน์)
+        macd = self.macd
+        line, hist, signal = kernels.macd(close, macd.fast.length, macd.slow.length, macd.signal.length)
+        macd.load(close, line)
+        self.rsi.load(close)
+        columns = [line, hist, signal, kernels.rsi(close, self.rsi.length)]
+        if self.sr is not None:
+            self.sr.load(low, high)
+            columns += [kernels.rolling_min(low, self.sr.support.window), kernels.rolling_max(high, self.sr.resistance.window)]
+        return np.column_stack(columns)
+
+    def snapshot(self):
+        return copy.deepcopy((self.macd, self.rsi, self.sr))
+
+    def restore(self, snap):
+        self.macd, self.rsi, self.sr = copy.deepcopy(snap)
+
+
+class IndicatorStream:
+    # ผูก IndicatorEngine เข้ากับ Series ราคาปิดที่ยาวขึ้นเรื่อยๆ
+    # sync() คำนวณเฉพาะแท่งใหม่ ถ้าแท่งสุดท้ายเปลี่ยน (ยังไม่ปิด) จะย้อนสถานะกลับหนึ่งแท่งแล้วคำนวณใหม่
+    # ถ้าจุดเริ่มของข้อมูลเปลี่ยน (เช่นเปลี่ยน Lookback) ต้องเริ่มใหม่ทั้งหมด เพราะค่า seed ของ EMA เปลี่ยน
+    # dtype=np.float32 เก็บผลที่คำนวณแล้วแบบ float32 (สถานะภายในของ engine ยังเป็น float64)
+    # sr_window=...: คำนวณ Support/Resistance ไปพร้อมกัน ต้องส่ง low/high ให้ sync (แท่งที่ยังไม่ปิดเปลี่ยน
+    # High/Low ได้ จึงเช็คทั้งสามค่า)
+
+    def __init__(self, dtype=np.float64, **params):
+        self.dtype = dtype
+        self.params = params
+        self.reset()
+
+    def reset(self):
+        self.engine = IndicatorEngine(**self.params)
+        self._index = pd.Index([])
+        self._last_bar = None
+        self._before_last = None
+        self.first_changed = 0
+        self._out = np.empty((0, len(self.engine.columns)), dtype=self.dtype)
+
+    def _rows(self, close, low, high, start):
+        # input ของแถว start..ท้าย เท่านั้น (ไม่แปลงทั้ง Series ทุก tick)
+        columns = [close.iloc[start:].to_numpy(dtype=float)]
+        if self.engine.sr is not None:
+            columns += [low.iloc[start:].to_numpy(dtype=float), high.iloc[start:].to_numpy(dtype=float)]
+        return np.column_stack(columns)
+
+    def sync(self, close, low=None, high=None):
+        # คืน DataFrame ที่อ้างถึง buffer ภายใน (ไม่คัดลอก) แถวสุดท้ายจะถูกเขียนทับใน sync ครั้งถัดไป
+        # ถ้าต้องเก็บไว้ข้ามรอบให้ .copy() เอง; first_changed = แถวแรกที่คำนวณในรอบนี้
+        index = close.index
+        n = len(self._index)
+        m = len(index)
+
+        if (n == 0 or m < n or index[0] != self._index[0]
+                or (n > 1 and index[n - 2] != self._index[n - 2])):
+            self.reset()
+            n = 0
+        elif index[n - 1] != self._index[n - 1] or tuple(self._rows(close, low, high, n - 1)[0]) != self._last_bar:
+            self.engine.restore(self._before_last)
+            n -= 1
+        self.first_changed = n
+
+        if m > len(self._out):
+            grown = np.empty((max(m, 2 * len(self._out)), len(self.engine.columns)), dtype=self.dtype)
+            grown[:n] = self._out[:n]
+            self._out = grown
+
+        if n == 0 and m > 1:
+            # เริ่มใหม่ทั้งชุด: ทุกแท่งยกเว้นแท่งสุดท้ายคำนวณแบบ vectorized แล้วค่อยเดินต่อทีละแท่ง
+            history = self._rows(close, low, high, 0)[:m - 1]
+            if not np.isnan(history).any():
+                self._out[:m - 1] = self.engine.load(*history.T)
+                n = m - 1
+
+        values = self._rows(close, low, high, n)
+        for i in range(n, m):
+            if i == m - 1:
+                self._before_last = self.engine.snapshot()
+            self._out[i] = self.engine.update(*values[i - n])
+
+        self._index = index
+        if m > n:
+            self._last_bar = tuple(values[-1])
+        return pd.DataFrame(self._out[:m], index=index, columns=self.engine.columns, copy=False)
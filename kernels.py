@@ -0,0 +1,294 @@
+import functools
+import importlib.util
+import threading
+
+import numpy as np
+import pandas as pd
+
+from strategy import engulfing as _engulfing_rule
+from strategy import evaluate_conditions
+
+DECISION_COLUMNS = ['buy_price', 'buy_rsi', 'buy_macd', 'sell_price', 'sell_rsi', 'sell_macd', 'Final_Buy', 'Final_Sell']
+
+# numba เป็นทางเลือก: ถ้ามีจะใช้ loop ที่ compile แล้ว (ไม่มี DataFrame และไม่มี array กลางทาง)
+# ถ้าไม่มีจะใช้สูตร numpy/pandas แบบ vectorized ที่ให้ผลเดียวกัน
+HAVE_NUMBA = importlib.util.find_spec('numba') is not None
+_PENDING = []
+_COMPILE_LOCK = threading.Lock()
+
+
+def njit(func=None, **options):
+    # import numba ใช้เวลาราวหนึ่งวินาที จึงยังไม่ import ตอนโหลดไฟล์: จด kernel ไว้ก่อน
+    # แล้ว compile ทุกตัวที่จดไว้ (แทนชื่อเดิมใน module ด้วยตัวที่ compile แล้ว) เมื่อ kernel ใดถูกเรียกครั้งแรก
+    if func is None:
+        return lambda f: njit(f, **options)
+    if not HAVE_NUMBA:
+        return func
+    _PENDING.append((func.__globals__, func.__name__, func, options))
+
+    @functools.wraps(func)
+    def first_call(*args):
+        _compile_pending()
+        return func.__globals__[func.__name__](*args)
+    return first_call
+
+
+def _compile_pending():
+    from numba import njit as numba_njit
+
+    with _COMPILE_LOCK:
+        while _PENDING:
+            namespace, name, func, options = _PENDING.pop(0)
+            namespace[name] = numba_njit(**options)(func)
+
+
+@njit(cache=True)
+def _ewm_column(x, out, alpha, adjust, min_periods):
+    # Series.ewm(alpha, adjust, min_periods).mean() สูตรเดียวกับ indicators._EWM
+    weighted = np.nan
+    old_wt = 1.0
+    nobs = 0
+    for i in range(len(x)):
+        v = x[i]
+        is_obs = v == v
+        if is_obs:
+            nobs += 1
+        if weighted == weighted:
+            old_wt *= 1.0 - alpha
+            if is_obs:
+                new_wt = 1.0 if adjust else alpha
+                if weighted != v:
+                    weighted = (old_wt * weighted + new_wt * v) / (old_wt + new_wt)
+                old_wt = old_wt + new_wt if adjust else 1.0
+        elif is_obs:
+            weighted = v
+        out[i] = weighted if nobs >= min_periods else np.nan
+
+
+@njit(cache=True)
+def _seeded_ema_column(x, out, length):
+    # ta.ema: นับจากค่าแรกที่มีข้อมูล seed ด้วย SMA ของ length ค่า แล้วต่อด้วย ewm(span=length, adjust=False)
+    n = len(x)
+    out[:] = np.nan
+    first = 0
+    while first < n and x[first] != x[first]:
+        first += 1
+    seed = first + length - 1
+    if seed >= n:
+        return
+    total = 0.0
+    for i in range(first, seed + 1):
+        total += x[i]
+    tail = x[seed:].copy()
+    tail[0] = total / length
+    _ewm_column(tail, out[seed:], 2.0 / (length + 1), False, 1)
+
+
+@njit(cache=True)
+def _macd_column(close, line, hist, signal, fast, slow, signal_length):
+    slow_ema = np.empty_like(close)
+    _seeded_ema_column(close, line, fast)
+    _seeded_ema_column(close, slow_ema, slow)
+    for i in range(len(close)):
+        line[i] -= slow_ema[i]
+    _seeded_ema_column(line, signal, signal_length)
+    for i in range(len(close)):
+        hist[i] = line[i] - signal[i]
+
+
+@njit(cache=True)
+def _rsi_column(close, out, length):
+    # Wilder RSI: rma = ewm(alpha=1/length, min_periods=length) ของกำไร/ขาดทุน
+    n = len(close)
+    if n == 0:
+        return
+    gain = np.empty(n)
+    loss = np.empty(n)
+    gain[0] = np.nan
+    loss[0] = np.nan
+    for i in range(1, n):
+        diff = close[i] - close[i - 1]
+        gain[i] = 0.0 if diff < 0 else diff
+        loss[i] = 0.0 if diff > 0 else -diff
+    avg_gain = np.empty(n)
+    avg_loss = np.empty(n)
+    _ewm_column(gain, avg_gain, 1.0 / length, True, length)
+    _ewm_column(loss, avg_loss, 1.0 / length, True, length)
+    for i in range(n):
+        total = avg_gain[i] + avg_loss[i]
+        out[i] = 100.0 * avg_gain[i] / total if total > 0 else np.nan
+
+
+@njit(cache=True)
+def _rolling_column(x, out, window, sign):
+    # rolling min (sign=1) / max (sign=-1) ด้วย monotonic deque O(n)
+    # window ที่มี NaN หรือยังไม่ครบให้ NaN เหมือน Series.rolling(window)
+    n = len(x)
+    queue = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    last_nan = -1
+    for i in range(n):
+        v = x[i]
+        if v != v:
+            last_nan = i
+        else:
+            while tail > head and sign * x[queue[tail - 1]] >= sign * v:
+                tail -= 1
+            queue[tail] = i
+            tail += 1
+        while tail > head and queue[head] <= i - window:
+            head += 1
+        if i >= window - 1 and last_nan <= i - window and tail > head:
+            out[i] = x[queue[head]]
+        else:
+            out[i] = np.nan
+
+
+@njit(cache=True)
+def _engulfing_column(open_, close, bullish, bearish):
+    # กติกาเดียวกับ strategy.engulfing ในรอบเดียว
+    if len(close) == 0:
+        return
+    bullish[0] = False
+    bearish[0] = False
+    for i in range(1, len(close)):
+        o, c, po, pc = open_[i], close[i], open_[i - 1], close[i - 1]
+        white = c >= o
+        prev_white = pc >= po
+        bullish[i] = white and not prev_white and ((c >= po and o < pc) or (c > po and o <= pc))
+        bearish[i] = not white and prev_white and ((o >= pc and c < po) or (o > pc and c <= po))
+
+
+@njit(cache=True)
+def _decide(low, high, support, resistance, rsi, macd, signal, rsi_low, rsi_high, out):
+    # กฎเดียวกับ strategy.evaluate_conditions ในรอบเดียว ไม่สร้าง shift(1) หรือ array กลางทาง
+    # out[k] คือแถวของ DECISION_COLUMNS[k]; NaN เทียบแล้วเป็น False เหมือนแบบ vectorized
+    for i in range(len(low)):
+        buy_price = low[i] <= support[i] * 1.02
+        sell_price = high[i] >= resistance[i] * 0.98
+        sell_rsi = rsi[i] > rsi_high
+        buy_rsi = False
+        buy_macd = False
+        sell_macd = False
+        if i > 0:
+            buy_rsi = rsi[i] < rsi_low and rsi[i] > rsi[i - 1]
+            buy_macd = macd[i] > signal[i] and macd[i - 1] <= signal[i - 1]
+            sell_macd = macd[i] < signal[i] and macd[i - 1] >= signal[i - 1]
+        out[0, i] = buy_price
+        out[1, i] = buy_rsi
+        out[2, i] = buy_macd
+        out[3, i] = sell_price
+        out[4, i] = sell_rsi
+        out[5, i] = sell_macd
+        out[6, i] = buy_price and buy_rsi and buy_macd
+        out[7, i] = sell_price and sell_rsi and sell_macd
+
+
+def _as_columns(x):
+    # รับ 1 มิติ (หนึ่ง series) หรือ 2 มิติ (แท่ง x ticker) คืน float64 ที่แต่ละคอลัมน์ต่อกันในหน่วยความจำ
+    x = np.asarray(x, dtype=np.float64)
+    return np.asfortranarray(x.reshape(len(x), -1)), x.ndim == 1
+
+
+def _shape(out, squeeze):
+    return out[:, 0] if squeeze else out
+
+
+def _seeded_ema_numpy(x, length):
+    n, t = x.shape
+    valid = ~np.isnan(x)
+    first = np.where(valid.any(axis=0), valid.argmax(axis=0), n)
+    seed_row = first + length - 1
+    cols = np.nonzero(seed_row < n)[0]
+
+    y = np.where(np.arange(n)[:, None] > seed_row, x, np.nan)
+    csum = np.vstack([np.zeros(t), np.nancumsum(x, axis=0)])
+    y[seed_row[cols], cols] = (csum[seed_row[cols] + 1, cols] - csum[first[cols], cols]) / length
+    return pd.DataFrame(y).ewm(span=length, adjust=False).mean().to_numpy()
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    # คืน (macd, histogram, signal) ตรงกับ ta.macd
+    c, squeeze = _as_columns(close)
+    if HAVE_NUMBA:
+        line, hist, sig = np.empty_like(c), np.empty_like(c), np.empty_like(c)
+        for j in range(c.shape[1]):
+            _macd_column(c[:, j], line[:, j], hist[:, j], sig[:, j], fast, slow, signal)
+    else:
+        line = _seeded_ema_numpy(c, fast) - _seeded_ema_numpy(c, slow)
+        sig = _seeded_ema_numpy(line, signal)
+        hist = line - sig
+    return _shape(line, squeeze), _shape(hist, squeeze), _shape(sig, squeeze)
+
+
+def rsi(close, length=14):
+    c, squeeze = _as_columns(close)
+    if HAVE_NUMBA:
+        out = np.empty_like(c)
+        for j in range(c.shape[1]):
+            _rsi_column(c[:, j], out[:, j], length)
+        return _shape(out, squeeze)
+
+    diff = np.diff(c, axis=0, prepend=np.nan)
+    gain = np.where(diff < 0, 0.0, diff)
+    loss = np.where(diff > 0, 0.0, -diff)
+    avg_gain = pd.DataFrame(gain).ewm(alpha=1.0 / length, min_periods=length).mean().to_numpy()
+    avg_loss = pd.DataFrame(loss).ewm(alpha=1.0 / length, min_periods=length).mean().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _shape(100 * avg_gain / (avg_gain + avg_loss), squeeze)
+
+
+def _rolling(x, window, sign):
+    values, squeeze = _as_columns(x)
+    if HAVE_NUMBA:
+        out = np.empty_like(values)
+        for j in range(values.shape[1]):
+            _rolling_column(values[:, j], out[:, j], window, sign)
+        return _shape(out, squeeze)
+    rolling = pd.DataFrame(values).rolling(window=window)
+    return _shape((rolling.min() if sign > 0 else rolling.max()).to_numpy(), squeeze)
+
+
+def rolling_min(x, window):
+    return _rolling(x, window, 1)
+
+
+def rolling_max(x, window):
+    return _rolling(x, window, -1)
+
+
+def engulfing(open_, close):
+    # คืน (bullish, bearish) เทียบกับแท่งก่อนหน้าในแต่ละคอลัมน์ แท่งแรกเป็น False
+    o, squeeze = _as_columns(open_)
+    c, _ = _as_columns(close)
+    if HAVE_NUMBA:
+        bullish, bearish = np.empty(c.shape, dtype=bool, order='F'), np.empty(c.shape, dtype=bool, order='F')
+        for j in range(c.shape[1]):
+            _engulfing_column(o[:, j], c[:, j], bullish[:, j], bearish[:, j])
+        return _shape(bullish, squeeze), _shape(bearish, squeeze)
+
+    prev_o = np.vstack([np.full((1, o.shape[1]), np.nan), o[:-1]])
+    prev_c = np.vstack([np.full((1, c.shape[1]), np.nan), c[:-1]])
+    bullish, bearish = _engulfing_rule(o, c, prev_o, prev_c)
+    return _shape(bullish, squeeze), _shape(bearish, squeeze)
+
+
+def _prev(x):
+    return np.concatenate(([np.nan], x[:-1]))
+
+
+def decide(low, high, support, resistance, rsi, macd, signal, rsi_low, rsi_high):
+    # คืน dict คีย์เดียวกับ evaluate_conditions (เป็น bool array) สำหรับ series เดียว
+    # ทุกคีย์เป็นแถวของ buffer (8, n) เดียวกัน จึงจองหน่วยความจำครั้งเดียว
+    low, high, support, resistance, rsi, macd, signal = (
+        np.ascontiguousarray(a, dtype=np.float64) for a in (low, high, support, resistance, rsi, macd, signal))
+    if HAVE_NUMBA:
+        out = np.empty((len(DECISION_COLUMNS), len(low)), dtype=bool)
+        _decide(low, high, support, resistance, rsi, macd, signal, float(rsi_low), float(rsi_high), out)
+        return dict(zip(DECISION_COLUMNS, out))
+
+    with np.errstate(invalid='ignore'):
+        cond = evaluate_conditions(low, high, support, resistance, rsi, _prev(rsi), macd, _prev(macd),
+                                   signal, _prev(signal), rsi_low, rsi_high)
+    return {column: cond[column] for column in DECISION_COLUMNS}
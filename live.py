@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from charts import base_figure
+from indicators import IndicatorStream
+from strategy import engulfing, evaluate_conditions
+from synthetic import synthetic_ohlcv
+
+LINE_TRACES = ['Support', 'Resistance', 'MACD', 'Signal', 'RSI']
+
+
+class SyntheticFeed:
+    # feed จำลองแทนของจริง (ใช้ทดสอบแบบ offline): poll() แต่ละครั้งขยับแท่งสุดท้ายที่ยังไม่ปิด
+    # และทุก ticks_per_bar ครั้งจะปิดแท่งแล้วเปิดแท่งใหม่
+
+    def __init__(self, bars=500, freq='1min', seed=0, ticks_per_bar=3):
+        self._rng = np.random.default_rng(seed)
+        self.bars = synthetic_ohlcv(bars, freq=freq, seed=seed)
+        self.step = pd.Timedelta(freq)
+        self.ticks_per_bar = ticks_per_bar
+        self._ticks = 0
+
+    def poll(self):
+        last_close = self.bars['Close'].iloc[-1]
+        price = last_close * np.exp(self._rng.normal(0, 0.002))
+        self._ticks += 1
+        if self._ticks % self.ticks_per_bar == 0:
+            row = pd.DataFrame({
+                'Open': [last_close], 'High': [max(last_close, price)], 'Low': [min(last_close, price)],
+                'Close': [price], 'Volume': [int(self._rng.integers(1_000, 1_000_000))],
+            }, index=pd.DatetimeIndex([self.bars.index[-1] + self.step], name='Date'))
+            self.bars = pd.concat([self.bars, row])
+        else:
+            self.bars = self.bars.copy()
+            last = len(self.bars) - 1
+            self.bars.iloc[last, self.bars.columns.get_loc('High')] = max(self.bars['High'].iloc[-1], price)
+            self.bars.iloc[last, self.bars.columns.get_loc('Low')] = min(self.bars['Low'].iloc[-1], price)
+            self.bars.iloc[last, self.bars.columns.get_loc('Close')] = price
+        return self.bars
+
+
+class StoreFeed:
+    # feed จาก BarStore: โหลดเฉพาะท้าย (ตั้งแต่แท่งสุดท้ายที่มี) เมื่อท้ายเก่ากว่า ttl เท่านั้น
+    # poll ระหว่างนั้นอ่านจากหน่วยความจำ (ไม่โหลดและไม่เขียน disk cache ซ้ำทุก poll)
+
+    def __init__(self, store, ticker, days=5, interval='1m', ttl=timedelta(minutes=1)):
+        self.store = store
+        self.ticker = ticker
+        self.days = days
+        self.interval = interval
+        self.ttl = ttl
+
+    def poll(self):
+        now = datetime.now()
+        start = now - timedelta(days=self.days)
+        stale = not self.store.is_fresh(self.ticker, start, interval=self.interval, now=now, ttl=self.ttl)
+        return self.store.get(self.ticker, start, interval=self.interval, now=now, refresh=stale)
+
+
+class LiveChart:
+    # สถานะของกราฟ live หนึ่ง symbol: แท่งใหม่ -> เดิน MACD/RSI/S-R ต่อแบบ incremental (IndicatorStream)
+    # คำนวณเงื่อนไข Buy/Sell เฉพาะแท่งที่เพิ่ม/เปลี่ยน แล้ว patch เฉพาะ trace ที่ข้อมูลเปลี่ยนในรูปเดิม
+    # (ไม่สร้าง make_subplots ใหม่) frame และกราฟเก็บเฉพาะ window แท่งล่าสุด งานต่อ tick จึงไม่โตตามความยาวข้อมูล
+
+    def __init__(self, rsi_low, rsi_high, sr_window, window=500):
+        self.rsi_low = rsi_low
+        self.rsi_high = rsi_high
+        self.sr_window = sr_window
+        self.window = window
+        self.stream = IndicatorStream(sr_window=sr_window)
+        self.frame = None
+        self.fig = None
+        self._traces = {}
+        self._columns = {}
+
+    def _compute_tail(self, bars, indicators, p):
+        # คำนวณแถว p..ท้าย โดยใช้แถวก่อนหน้า (shift) ส่วน S/R มาจาก stream (monotonic deque ไม่ต้อง rolling ใหม่)
+        s = max(p - 1, 0)
+        tail = bars.iloc[s:].copy()
+        ind = indicators.iloc[s:]
+        m_line, m_hist, m_signal = indicators.columns[:3]
+        tail[m_line], tail[m_hist], tail[m_signal] = ind[m_line], ind[m_hist], ind[m_signal]
+        tail['RSI'] = ind.iloc[:, 3]
+        tail['RSI_Up'] = tail['RSI'] > tail['RSI'].shift(1)
+        tail['Support'], tail['Resistance'] = ind['Support'], ind['Resistance']
+        tail['Bullish_Engulfing'], tail['Bearish_Engulfing'] = engulfing(
+            tail['Open'], tail['Close'], tail['Open'].shift(1), tail['Close'].shift(1))
+
+        cond = evaluate_conditions(
+            tail['Low'], tail['High'], tail['Support'], tail['Resistance'],
+            tail['RSI'], tail['RSI'].shift(1), tail[m_line], tail[m_line].shift(1), tail[m_signal], tail[m_signal].shift(1),
+            self.rsi_low, self.rsi_high,
+        )
+        tail['Final_Buy'], tail['Final_Sell'] = cond['Final_Buy'], cond['Final_Sell']
+        return tail.iloc[p - s:], m_line, m_signal
+
+    def _build_figure(self, m_line, m_signal):
+        import plotly.graph_objects as go
+
+        fig = base_figure(self.frame, m_line, m_signal)
+        # marker ต้องมี trace เสมอ (แม้ว่าง) เพื่อให้ patch ทีหลังได้
+        fig.add_trace(go.Scatter(x=[], y=[], mode='markers', marker=dict(symbol='triangle-up', size=15, color='#00FF00'), name='ENTRY'), row=1, col=1)
+        fig.add_trace(go.Scatter(x=[], y=[], mode='markers', marker=dict(symbol='triangle-down', size=15, color='#FF0000'), name='EXIT'), row=1, col=1)
+        fig.add_hline(y=self.rsi_high, line_dash="dash", line_color="red", row=3, col=1)
+        fig.add_hline(y=self.rsi_low, line_dash="dash", line_color="green", row=3, col=1)
+        self.fig = fig
+        self._traces = {trace.name: i for i, trace in enumerate(fig.data)}
+        self._columns = {'Support': 'Support', 'Resistance': 'Resistance', 'MACD': m_line, 'Signal': m_signal, 'RSI': 'RSI'}
+        self._patch_markers()
+
+    def _patch_markers(self):
+        f = self.frame
+        buy, sell = f['Final_Buy'].to_numpy(dtype=bool), f['Final_Sell'].to_numpy(dtype=bool)
+        self.fig.data[self._traces['ENTRY']].update(x=f.index[buy], y=f['Low'].to_numpy()[buy] * 0.98)
+        self.fig.data[self._traces['EXIT']].update(x=f.index[sell], y=f['High'].to_numpy()[sell] * 1.02)
+
+    def update(self, bars):
+        # คืนชื่อ trace ที่ถูกแก้ในรอบนี้
+        if bars is None or bars.empty:
+            return []
+        indicators = self.stream.sync(bars['Close'], bars['Low'], bars['High'])
+        # แถวแรกที่ stream คำนวณใหม่ (len(bars) = ไม่มีอะไรเปลี่ยน, 0 = เริ่มใหม่ทั้งหมด)
+        p = self.stream.first_changed
+        if p == len(bars) and self.frame is not None:
+            return []
+
+        if p == 0 or self.frame is None:
+            tail, m_line, m_signal = self._compute_tail(bars, indicators, max(len(bars) - self.window, 0))
+            self.frame = tail
+            self._build_figure(m_line, m_signal)
+            return list(self._traces)
+
+        tail, m_line, m_signal = self._compute_tail(bars, indicators, p)
+        old = self.frame
+        revised = old.index >= tail.index[0]
+        signals_changed = bool(tail['Final_Buy'].any() or tail['Final_Sell'].any()
+                               or old['Final_Buy'].to_numpy()[revised].any() or old['Final_Sell'].to_numpy()[revised].any())
+        self.frame = pd.concat([old[~revised], tail]).iloc[-self.window:]
+
+        f = self.frame
+        changed = ['Price', *LINE_TRACES]
+        with self.fig.batch_update():
+            self.fig.data[self._traces['Price']].update(x=f.index, open=f['Open'], high=f['High'], low=f['Low'], close=f['Close'])
+            for name in LINE_TRACES:
+                self.fig.data[self._traces[name]].update(x=f.index, y=f[self._columns[name]])
+            if signals_changed:
+                self._patch_markers()
+                changed += ['ENTRY', 'EXIT']
+        return changed
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+
+from pipeline import backtest, combine, run
+from providers import SOURCES
+from regime import GATES
+from scanner import parse_universe, read_universe
+from timeframes import TIMEFRAMES
+
+
+def write(frame, path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        frame.to_csv(path)
+    elif ext in ('.arrow', '.feather'):
+        frame.reset_index().to_feather(path)
+    else:
+        frame.to_parquet(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='macd-scan',
+                                     description="Run the MACD/RSI/S-R strategy pipeline headless (no Streamlit/Plotly).")
+    parser.add_argument('--tickers', required=True,
+                        help="ticker list file (one per line or comma separated) or a comma separated list")
+    parser.add_argument('--interval', choices=TIMEFRAMES, default='1d')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--rsi-low', type=int, default=40)
+    parser.add_argument('--rsi-high', type=int, default=65)
+    parser.add_argument('--sr-window', type=int, default=20)
+    parser.add_argument('--confirm', choices=TIMEFRAMES, help="require this higher timeframe's MACD to agree")
+    parser.add_argument('--regime', choices=GATES, default='Off', help="HMM regime gate")
+    parser.add_argument('--fee', type=float, default=0.1, help="backtest fee per trade (%%)")
+    parser.add_argument('--source', choices=SOURCES, default='yfinance')
+    parser.add_argument('--data-dir', help="directory for the 'Local files' source")
+    parser.add_argument('--latest', action='store_true', help="write only the latest bar of each ticker")
+    parser.add_argument('--out', default='signals.parquet', help="output file (.parquet, .csv or .arrow)")
+    args = parser.parse_args(argv)
+
+    tickers = read_universe(args.tickers) if os.path.isfile(args.tickers) else parse_universe(args.tickers)
+    if not tickers:
+        parser.error("no tickers given")
+    if args.confirm and TIMEFRAMES.index(args.confirm) <= TIMEFRAMES.index(args.interval):
+        parser.error("--confirm must be a higher timeframe than --interval")
+
+    results, errors = run(tickers, args.days, args.interval, args.rsi_low, args.rsi_high, args.sr_window,
+                          source=args.source, data_dir=args.data_dir, confirm=args.confirm, regime=args.regime)
+    for ticker, error in errors.items():
+        print(f"  {ticker}: {error}", file=sys.stderr)
+
+    print(f"{'Ticker':<12} {'Date':<26} {'Close':>12} {'Signal':<6} {'Return':>9} {'Trades':>6}")
+    for ticker, df in results.items():
+        last = df.iloc[-1]
+        stats = backtest(df, fee=args.fee / 100)['stats']
+        signal = 'BUY' if last['Final_Buy'] else 'SELL' if last['Final_Sell'] else '-'
+        print(f"{ticker:<12} {str(df.index[-1]):<26} {last['Close']:>12.4f} {signal:<6} "
+              f"{stats['Total Return']:>9.2%} {stats['Trades']:>6}")
+
+    frame = combine(results, latest=args.latest)
+    if not frame.empty:
+        write(frame, args.out)
+        print(f"wrote {len(frame)} rows for {len(results)} tickers to {args.out}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import numpy as np
+
+from backtest import periods_per_year, positions
+from support_resistance import SR_WINDOWS, SRTable
+
+RSI_LOWS = np.arange(10, 51)
+RSI_HIGHS = np.arange(50, 91)
+METRICS = ['Sharpe', 'Total Return', 'Trades']
+OBJECTIVES = ['Sharpe', 'Total Return']
+
+
+def _shift(x):
+    out = np.full(len(x), np.nan)
+    out[1:] = x[:-1]
+    return out
+
+
+def run_sweep(close, low, high, rsi, macd, signal, rsi_lows=RSI_LOWS, rsi_highs=RSI_HIGHS,
+              sr_windows=SR_WINDOWS, fee=0.001, n_samples=None, max_cells=2 ** 24, seed=0, sr_table=None):
+    # ค้นหา rsi_low / rsi_high / sr_window ทุกชุด (grid) หรือสุ่ม n_samples ชุด (random search)
+    # MACD/RSI คำนวณมาแล้วครั้งเดียว ส่วน S/R ทุก window มาจาก SRTable (ส่ง sr_table ที่ cache ไว้มาได้)
+    # และการเทียบ threshold ทำเป็น array 2 มิติ (ชุดพารามิเตอร์ x เวลา) ทีละ chunk ไม่เกิน max_cells
+    index = close.index
+    price = close.to_numpy(dtype=float)
+    low = np.asarray(low, dtype=float)
+    high = np.asarray(high, dtype=float)
+    rsi = np.asarray(rsi, dtype=float)
+    macd = np.asarray(macd, dtype=float)
+    signal = np.asarray(signal, dtype=float)
+    rsi_lows, rsi_highs, sr_windows = np.asarray(rsi_lows), np.asarray(rsi_highs), np.asarray(sr_windows)
+    n = len(price)
+
+    ret = np.zeros(n)
+    ret[1:] = np.nan_to_num(price[1:] / price[:-1] - 1)
+    ann = np.sqrt(periods_per_year(index))
+
+    # ส่วนที่ไม่ขึ้นกับพารามิเตอร์
+    buy_macd = (macd > signal) & (_shift(macd) <= _shift(signal))
+    sell_macd = (macd < signal) & (_shift(macd) >= _shift(signal))
+    buy_rsi = (rsi[None, :] < rsi_lows[:, None]) & (rsi > _shift(rsi))
+    sell_rsi = rsi[None, :] > rsi_highs[:, None]
+
+    shape = (len(sr_windows), len(rsi_lows), len(rsi_highs))
+    results = {name: np.full(shape, np.nan) for name in METRICS}
+
+    if n_samples is None:
+        li, hi = np.meshgrid(np.arange(len(rsi_lows)), np.arange(len(rsi_highs)), indexing='ij')
+        pairs = [(li.ravel(), hi.ravel())] * len(sr_windows)
+    else:
+        rng = np.random.default_rng(seed)
+        flat = rng.choice(np.prod(shape), size=min(n_samples, int(np.prod(shape))), replace=False)
+        wi, li, hi = np.unravel_index(flat, shape)
+        pairs = [(li[wi == w], hi[wi == w]) for w in range(len(sr_windows))]
+
+    if sr_table is None:
+        sr_table = SRTable(low, high, sr_windows)
+
+    chunk = max(1, max_cells // max(n, 1))
+    for w, window in enumerate(sr_windows):
+        li, hi = pairs[w]
+        if len(li) == 0:
+            continue
+        support, resistance = sr_table.get(window)
+        buy = buy_rsi & (buy_macd & (low <= support * 1.02))
+        sell = sell_rsi & (sell_macd & (high >= resistance * 0.98))
+
+        for start in range(0, len(li), chunk):
+            l_idx, h_idx = li[start:start + chunk], hi[start:start + chunk]
+            pos = positions(buy[l_idx], sell[h_idx]).astype(float)
+            held = np.zeros_like(pos)
+            held[:, 1:] = pos[:, :-1]
+            change = np.diff(pos, axis=1, prepend=0.0)
+            strat = held * ret - np.abs(change) * fee
+
+            std = strat[:, 1:].std(axis=1, ddof=1) if n > 2 else np.zeros(len(pos))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sharpe = np.where(std > 0, strat[:, 1:].mean(axis=1) / std * ann, np.nan)
+            results['Sharpe'][w, l_idx, h_idx] = sharpe
+            results['Total Return'][w, l_idx, h_idx] = np.expm1(np.log1p(strat).sum(axis=1))
+            results['Trades'][w, l_idx, h_idx] = (change > 0).sum(axis=1)
+
+    return {
+        'rsi_lows': rsi_lows,
+        'rsi_highs': rsi_highs,
+        'sr_windows': sr_windows,
+        'results': results,
+    }
+
+
+def best_params(sweep, objective='Sharpe'):
+    values = sweep['results'][objective]
+    if np.isnan(values).all():
+        return None
+    w, lo, hi = np.unravel_index(np.nanargmax(values), values.shape)
+    return {
+        'rsi_low': int(sweep['rsi_lows'][lo]),
+        'rsi_high': int(sweep['rsi_highs'][hi]),
+        'sr_window': int(sweep['sr_windows'][w]),
+        **{name: float(sweep['results'][name][w, lo, hi]) for name in METRICS},
+    }
@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from optimize import run_sweep
+from scanner import scan
+from support_resistance import SR_WINDOWS
+
+
+def make_pool(workers=None):
+    # ไม่ใช้ fork (ค่าเริ่มต้นบน Linux): fork จาก server ที่มีหลาย thread อาจติด lock ที่ถูกถือไว้ตอน fork
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=context)
+
+
+def _run_shard(shm_name, shape, fields, index, columns, lo, hi, func, kwargs):
+    # worker: เปิด shared memory ตามชื่อแล้วสร้าง DataFrame เฉพาะคอลัมน์ [lo, hi) แบบไม่คัดลอก
+    shm = SharedMemory(name=shm_name)
+    try:
+        data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        frames = {field: pd.DataFrame(data[i, :, lo:hi], index=index, columns=columns, copy=False)
+                  for i, field in enumerate(fields)}
+        result = func(frames, **kwargs)
+        del frames, data
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            # ยังมี view ค้างอยู่ (เช่น func ล้มกลางทาง) ปล่อยให้ถูกคืนตอน process จบ
+            pass
+    return result
+
+
+def run_sharded(func, frames, workers=None, executor=None, **kwargs):
+    # แบ่ง ticker (คอลัมน์ของตารางกว้าง) เป็นชุดตามจำนวน core แล้วรัน func(frames, **kwargs) ขนานกัน
+    # ข้อมูล OHLCV ถูกวางไว้ใน shared memory ก้อนเดียว ไม่ต้อง pickle DataFrame ส่งให้ worker
+    # func ต้องเป็นฟังก์ชันระดับ module และคืน DataFrame ที่ index เป็น ticker
+    # executor: pool ที่เปิดค้างไว้ใช้ซ้ำ (app.py cache ไว้) ถ้าไม่ส่งจะเปิดและปิด pool ใหม่ทุกครั้ง
+    close = frames['Close']
+    workers = min(workers or os.cpu_count() or 1, len(close.columns))
+    if workers <= 1:
+        return func(frames, **kwargs)
+
+    fields = list(frames)
+    index, columns = close.index, close.columns
+    shape = (len(fields), len(index), len(columns))
+    shm = SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+    try:
+        data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        for i, field in enumerate(fields):
+            data[i] = frames[field].reindex(index=index, columns=columns).to_numpy(dtype=float)
+        del data
+
+        bounds = np.linspace(0, len(columns), workers + 1).astype(int)
+        pool = executor or make_pool(workers)
+        try:
+            futures = [
+                pool.submit(_run_shard, shm.name, shape, fields, index, columns[lo:hi], lo, hi, func, kwargs)
+                for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo
+            ]
+            results = [future.result() for future in futures]
+        finally:
+            if executor is None:
+                pool.shutdown()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return pd.concat(results)
+
+
+def scan_parallel(frames, rsi_low=40, rsi_high=65, sr_window=20, workers=None, executor=None):
+    return run_sharded(scan, frames, workers=workers, executor=executor,
+                       rsi_low=rsi_low, rsi_high=rsi_high, sr_window=sr_window)
+
+
+def _sweep_shard(close, low, high, rsi, macd, signal, sr_windows, kwargs):
+    return run_sweep(close, low, high, rsi, macd, signal, sr_windows=sr_windows, **kwargs)
+
+
+def sweep_parallel(close, low, high, rsi, macd, signal, sr_windows=SR_WINDOWS, workers=None, executor=None, **kwargs):
+    # grid sweep ของ optimize.run_sweep แบ่ง sr_window เป็นชุดตามจำนวน core แล้วต่อผลตามแกน window
+    # input เป็น ticker เดียว (ไม่กี่ array) จึงส่งแบบ pickle ไม่ต้องใช้ shared memory
+    # random search (n_samples) สุ่มจากทั้ง grid จึงรันใน process นี้เหมือนเดิม
+    sr_windows = np.asarray(sr_windows)
+    workers = min(workers or os.cpu_count() or 1, len(sr_windows))
+    if workers <= 1 or kwargs.get('n_samples') is not None:
+        return run_sweep(close, low, high, rsi, macd, signal, sr_windows=sr_windows, **kwargs)
+
+    arrays = [np.asarray(a, dtype=float) for a in (low, high, rsi, macd, signal)]
+    pool = executor or make_pool(workers)
+    try:
+        futures = [pool.submit(_sweep_shard, close, *arrays, shard, kwargs)
+                   for shard in np.array_split(sr_windows, workers)]
+        parts = [future.result() for future in futures]
+    finally:
+        if executor is None:
+            pool.shutdown()
+    return {
+        'rsi_lows': parts[0]['rsi_lows'],
+        'rsi_highs': parts[0]['rsi_highs'],
+        'sr_windows': sr_windows,
+        'results': {name: np.concatenate([part['results'][name] for part in parts]) for name in parts[0]['results']},
+    }
@@ -0,0 +1,91 @@
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from async_fetch import warm_store
+from backtest import run_backtest
+from bar_store import BarStore
+from disk_cache import DiskCache
+from providers import make_provider
+from regime import RegimeModel, regime_gate
+from signal_store import compute_signals
+from timeframes import higher_trend, plan, to_timeframe
+
+# ขั้นตอนเดียวกับหน้า dashboard (โหลดข้อมูล -> ตัวชี้วัด -> เงื่อนไข -> backtest) แบบไม่ต้องมี UI
+# ห้าม import streamlit/plotly ในไฟล์นี้และไฟล์ที่ไฟล์นี้ import (ใช้กับ cron/batch job)
+
+
+def make_store(source='yfinance', data_dir=None):
+    # BarStore แบบเดียวกับ app.py: yfinance ใช้ DiskCache ร่วมกับ dashboard (ตั้งค่าผ่าน environment เดียวกัน)
+    tail_ttl = timedelta(minutes=int(os.environ.get('MACD_CACHE_TTL_MIN', '15')))
+    cache = None
+    if source == 'yfinance':
+        cache = DiskCache(os.environ.get('MACD_CACHE_DIR', '.cache/bars'),
+                          max_bytes=int(os.environ.get('MACD_CACHE_MAX_MB', '512')) * 1024 * 1024)
+    return BarStore(downloader=make_provider(source, data_dir).download, cache=cache, tail_ttl=tail_ttl)
+
+
+def fetch(store, ticker, days, interval='1d', now=None):
+    # คืน (bars ของ interval, base series ที่โหลดจริง) หรือ (None, None)
+    base_interval, days = plan(interval, days, store, ticker, now)
+    start = (now or datetime.now()) - timedelta(days=days)
+    base = store.get(ticker, start, interval=base_interval, now=now)
+    return to_timeframe(base, base_interval, interval), base
+
+
+def signals(bars, rsi_low=40, rsi_high=65, sr_window=20, base=None, confirm=None, regime=None, regime_model=None):
+    # ตัวชี้วัด + เงื่อนไขทุกแท่ง; confirm = timeframe ที่ใช้ยืนยัน (ต้องส่ง base), regime = ชื่อ gate ใน regime.GATES
+    df = compute_signals(bars, rsi_low, rsi_high, sr_window)
+    if confirm:
+        buy_ok, sell_ok = higher_trend(base, confirm, df.index)
+        df['Final_Buy'] &= buy_ok
+        df['Final_Sell'] &= sell_ok
+    if regime and regime != 'Off':
+        regimes = (regime_model or RegimeModel()).regimes(df['Close'])
+        buy_ok, sell_ok = regime_gate(regimes, regime)
+        df['Regime'] = regimes
+        df['Final_Buy'] &= buy_ok
+        df['Final_Sell'] &= sell_ok
+    return df
+
+
+def backtest(df, fee=0.001):
+    return run_backtest(df['Close'], df['Final_Buy'], df['Final_Sell'], fee=fee)
+
+
+def run(tickers, days=365, interval='1d', rsi_low=40, rsi_high=65, sr_window=20, source='yfinance', data_dir=None,
+        confirm=None, regime=None, store=None, now=None):
+    # ทั้ง universe: คืน (dict ticker -> DataFrame สัญญาณ, dict ticker -> error)
+    store = store or make_store(source, data_dir)
+    now = now or datetime.now()
+    errors = {}
+    if source == 'yfinance':
+        # จัดกลุ่มตาม base ที่ fetch() จะใช้ (ticker ที่มี series ละเอียดกว่าอยู่แล้วไม่ต้องโหลด interval ของตัวเอง)
+        groups = {}
+        for ticker in tickers:
+            groups.setdefault(plan(interval, days, store, ticker, now), []).append(ticker)
+        for (base_interval, fetch_days), group in groups.items():
+            errors.update(warm_store(store, group, now - timedelta(days=fetch_days), interval=base_interval, now=now))
+
+    results = {}
+    for ticker in tickers:
+        if ticker in errors:
+            continue
+        try:
+            bars, base = fetch(store, ticker, days, interval, now=now)
+            if bars is None or len(bars) <= sr_window:
+                errors[ticker] = ValueError("not enough bars")
+                continue
+            results[ticker] = signals(bars, rsi_low, rsi_high, sr_window, base=base, confirm=confirm, regime=regime)
+        except Exception as e:
+            errors[ticker] = e
+    return results, errors
+
+
+def combine(results, latest=False):
+    # รวมผลทุก ticker เป็นตารางยาว (คอลัมน์ Ticker) หรือเฉพาะแท่งล่าสุดของแต่ละ ticker
+    frames = [(df.iloc[[-1]] if latest else df).rename_axis('Date').assign(Ticker=ticker) for ticker, df in results.items()]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames).reset_index().set_index(['Ticker', 'Date'])
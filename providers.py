@@ -0,0 +1,114 @@
+import os
+import zlib
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import pandas as pd
+
+from bar_store import yf_download
+from synthetic import synthetic_ohlcv
+
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+INTERVAL_FREQ = {'1m': '1min', '5m': '5min', '15m': '15min', '30m': '30min', '1h': '1h', '1d': '1D', '1wk': 'W-MON'}
+SOURCES = ['yfinance', 'Local files', 'Synthetic']
+
+
+def normalize_ohlcv(df):
+    # ทุก provider คืนหน้าตาเดียวกัน: DatetimeIndex ชื่อ Date + คอลัมน์ Open/High/Low/Close/Volume แบบ float
+    if df is None or df.empty:
+        return None
+    columns = {c: c.strip().title() for c in df.columns}
+    df = df.rename(columns=columns)
+    if not isinstance(df.index, pd.DatetimeIndex):
+        for name in ('Date', 'Datetime', 'Timestamp', 'Time'):
+            if name in df.columns:
+                df = df.set_index(name)
+                break
+        df.index = pd.to_datetime(df.index)
+    df.index.name = 'Date'
+    if 'Volume' not in df.columns:
+        df['Volume'] = 0
+    return df[OHLCV].astype(float).sort_index()
+
+
+def _slice(df, start, end):
+    tz = df.index.tz
+    start = pd.Timestamp(start)
+    if tz is not None and start.tzinfo is None:
+        start = start.tz_localize(tz)
+    mask = df.index >= start
+    if end is not None:
+        end = pd.Timestamp(end)
+        if tz is not None and end.tzinfo is None:
+            end = end.tz_localize(tz)
+        mask &= df.index < end
+    return df[mask]
+
+
+class YFinanceProvider:
+    name = 'yfinance'
+
+    def download(self, ticker, start, end=None, interval='1d'):
+        return normalize_ohlcv(yf_download(ticker, start, end, interval))
+
+
+class LocalFileProvider:
+    # อ่านไฟล์จากโฟลเดอร์ที่ความเร็วดิสก์ (ไม่ใช้ network): {ticker}_{interval}.parquet/.csv
+    # หรือ {ticker}.parquet/.csv (ถือเป็นข้อมูลของทุก interval)
+    name = 'local'
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, ticker, interval):
+        stem = quote(ticker, safe='')
+        for name in (f"{stem}_{interval}", stem):
+            for ext in ('.parquet', '.csv'):
+                path = os.path.join(self.root, name + ext)
+                if os.path.isfile(path):
+                    return path
+        return None
+
+    def download(self, ticker, start, end=None, interval='1d'):
+        path = self._path(ticker, interval)
+        if path is None:
+            return None
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, index_col=0, parse_dates=True)
+        df = normalize_ohlcv(df)
+        return None if df is None else _slice(df, start, end)
+
+
+class SyntheticProvider:
+    # ข้อมูลสังเคราะห์ในหน่วยความจำ: ticker เดิม + interval เดิมได้ชุดเดิมเสมอ (seed จากชื่อ ticker)
+    # ใช้ในสภาพแวดล้อมที่ไม่มี network
+    name = 'synthetic'
+
+    def __init__(self, epoch='2015-01-01', intraday_days=60):
+        self.epoch = pd.Timestamp(epoch)
+        self.intraday_days = intraday_days
+
+    def download(self, ticker, start, end=None, interval='1d'):
+        freq = INTERVAL_FREQ.get(interval, '1D')
+        now = pd.Timestamp(datetime.now())
+        # สร้างถึงสิ้นวันนี้เสมอแล้วค่อยตัด ให้การโหลดหัว/ท้ายแยกกันได้ข้อมูลชุดเดียวกัน
+        horizon = now.normalize() + timedelta(days=1)
+        epoch = self.epoch
+        if pd.Timedelta(freq if freq[0].isdigit() else '1D') < pd.Timedelta('1D'):
+            epoch = max(epoch, horizon - timedelta(days=self.intraday_days + 1))
+        bars = len(pd.date_range(epoch, horizon, freq=freq, inclusive='left'))
+        if bars == 0:
+            return None
+        seed = zlib.crc32(f"{ticker}|{interval}".encode())
+        df = synthetic_ohlcv(bars, start=epoch, freq=freq, seed=seed)
+        return _slice(df[df.index <= now], start, end)
+
+
+def make_provider(source, data_dir=None):
+    if source == 'Local files':
+        return LocalFileProvider(data_dir or os.environ.get('MACD_DATA_DIR', 'data'))
+    if source == 'Synthetic':
+        return SyntheticProvider()
+    return YFinanceProvider()
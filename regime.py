@@ -0,0 +1,174 @@
+import copy
+import threading
+
+import numpy as np
+
+from kernels import njit
+
+BEAR, NEUTRAL, BULL = -1, 0, 1
+REGIME_NAMES = {BEAR: 'Bear', NEUTRAL: 'Neutral', BULL: 'Bull'}
+GATES = ['Off', 'Avoid bear (buy)', 'Trend-follow']
+
+
+def features(close, vol_window=20):
+    # log return และความผันผวน (std ของ return ย้อนหลัง vol_window แท่ง) แถวที่ยังไม่ครบเป็น NaN
+    close = np.asarray(close, dtype=float)
+    ret = np.full(len(close), np.nan)
+    ret[1:] = np.diff(np.log(close))
+    vol = np.full(len(close), np.nan)
+    if len(close) > vol_window:
+        windows = np.lib.stride_tricks.sliding_window_view(ret[1:], vol_window)
+        vol[vol_window:] = windows.std(axis=1, ddof=1)
+    return np.column_stack([ret, vol])
+
+
+@njit(cache=True)
+def _forward_states(log_b, startprob, transmat):
+    # forward filter: state ที่น่าจะเป็นที่สุด ณ แต่ละแท่งโดยใช้ข้อมูลถึงแท่งนั้นเท่านั้น (ไม่ใช้ Viterbi/smoothing
+    # ซึ่งมองเห็นอนาคต) ส่วนพารามิเตอร์ที่ใช้ต้อง fit จากข้อมูลก่อนแท่งนั้นด้วย ดู RegimeModel
+    n, k = log_b.shape
+    states = np.empty(n, dtype=np.int64)
+    alpha = startprob.copy()
+    prior = np.empty(k)
+    for t in range(n):
+        if t > 0:
+            for j in range(k):
+                prior[j] = 0.0
+                for i in range(k):
+                    prior[j] += alpha[i] * transmat[i, j]
+            alpha[:] = prior
+        row_max = log_b[t].max()
+        total = 0.0
+        for j in range(k):
+            alpha[j] *= np.exp(log_b[t, j] - row_max)
+            total += alpha[j]
+        if total == 0.0:
+            # ความน่าจะเป็นต่ำจน underflow: เริ่มใหม่จาก emission ของแท่งนี้อย่างเดียว
+            for j in range(k):
+                alpha[j] = np.exp(log_b[t, j] - row_max)
+                total += alpha[j]
+        for j in range(k):
+            alpha[j] /= total
+        states[t] = alpha.argmax()
+    return states
+
+
+def _log_emission(model, x):
+    # log pdf ของ Gaussian แต่ละ state (covariance แบบ full)
+    out = np.empty((len(x), model.n_components))
+    for j in range(model.n_components):
+        chol = np.linalg.cholesky(model.covars_[j])
+        z = np.linalg.solve(chol, (x - model.means_[j]).T)
+        out[:, j] = -0.5 * (z ** 2).sum(axis=0) - np.log(np.diag(chol)).sum() - 0.5 * x.shape[1] * np.log(2 * np.pi)
+    return out
+
+
+class RegimeModel:
+    # Gaussian HMM บน (return, volatility) ของ ticker หนึ่ง ใช้ร่วมกันทุก session แบบ walk-forward:
+    # fit ที่แท่ง t ใช้ข้อมูลก่อน t เท่านั้น แล้วใช้พารามิเตอร์ชุดนั้น (รวมการแปลง state -> Bear/Bull) ตั้งแต่แท่ง t
+    # จนถึงการ fit ครั้งถัดไป backtest จึงไม่เห็นอนาคต fit ใหม่เมื่อครบรอบ หรือเมื่อ log-likelihood
+    # เฉลี่ยของ drift_window แท่งล่าสุดต่ำกว่าตอน fit เกิน drift_tolerance (เช็คทุก drift_step แท่ง)
+    # รอบ fit ที่แท่ง t ยาว max(refit_bars, t * refit_growth) แท่ง จำนวนครั้งจึงโตแบบ log ตามความยาวข้อมูล
+    # แต่ละครั้งเริ่มจากพารามิเตอร์เดิม (warm start) จึงใช้ EM ไม่กี่รอบ และ fit บนข้อมูลล่าสุดไม่เกิน max_fit_bars แท่ง
+    # ทุก segment นับจากแท่งแรกของข้อมูล: ผลขึ้นกับ input เท่านั้น ถ้าแท่งแรกเปลี่ยน (เช่น Lookback) จะเริ่มใหม่
+    # ช่วงที่ fit แล้วถูกเก็บไว้ rerun ถัดไป (ข้อมูลชุดเดิมที่ยาวขึ้น) fit เฉพาะช่วงใหม่
+
+    def __init__(self, n_states=3, refit_bars=20, refit_growth=0.05, drift_window=50, drift_tolerance=1.0,
+                 drift_step=5, max_fit_bars=5000, seed=0):
+        self.n_states = n_states
+        self.refit_bars = refit_bars
+        self.refit_growth = refit_growth
+        self.drift_window = drift_window
+        self.drift_tolerance = drift_tolerance
+        self.drift_step = drift_step
+        self.max_fit_bars = max_fit_bars
+        self.seed = seed
+        self.fits = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.hmm = None
+        self.anchor = None
+        # segments: [(เวลาแท่งแรกที่ใช้, scaler, hmm, labels, baseline)] เรียงตามเวลา
+        self.segments = []
+
+    def _fit(self, x):
+        # hmmlearn/scikit-learn ใช้เวลา import นาน จึง import เมื่อ fit ครั้งแรกเท่านั้น
+        from hmmlearn.hmm import GaussianHMM
+        from sklearn.preprocessing import StandardScaler
+
+        x = x[-self.max_fit_bars:]
+        scaler = StandardScaler().fit(x)
+        z = scaler.transform(x)
+        if self.hmm is None:
+            self.hmm = GaussianHMM(self.n_states, covariance_type='full', n_iter=100, random_state=self.seed)
+        else:
+            # warm start: ไม่สุ่มค่าเริ่มใหม่ เริ่ม EM จากพารามิเตอร์ที่ fit ไว้ (scale ใหม่ใกล้เดิมมาก)
+            self.hmm.init_params = ''
+            self.hmm.n_iter = 10
+        self.hmm.fit(z)
+        # เรียง state ตามค่าเฉลี่ย return: ต่ำสุด = Bear, สูงสุด = Bull
+        order = np.argsort(self.hmm.means_[:, 0])
+        labels = np.full(self.n_states, NEUTRAL)
+        labels[order[0]], labels[order[-1]] = BEAR, BULL
+        self.fits += 1
+        return scaler, copy.deepcopy(self.hmm), labels, self.hmm.score(z) / len(z)
+
+    def _next_fit(self, x, t):
+        # ตำแหน่งถัดไปที่ต้อง fit ใหม่หลังจาก fit ที่ t (drift ที่ u ดูเฉพาะแท่งก่อน u)
+        _, scaler, hmm, _, baseline = self.segments[-1]
+        refit = t + max(self.refit_bars, int(t * self.refit_growth))
+        for u in range(max(t + self.drift_step, self.drift_window), min(refit, len(x)), self.drift_step):
+            recent = scaler.transform(x[u - self.drift_window:u])
+            if hmm.score(recent) / len(recent) < baseline - self.drift_tolerance:
+                return u
+        return refit
+
+    def _walk_forward(self, x, index):
+        min_bars = max(10 * self.n_states, self.drift_window)
+        if index[0] != self.anchor:
+            # แท่งแรกไม่ตรงกับที่เคย fit (Lookback เปลี่ยน): warm start และรอบ fit ต่างไป เริ่ม walk-forward ใหม่ทั้งหมด
+            self._reset()
+            self.anchor = index[0]
+        if self.segments:
+            t = self._next_fit(x, index.searchsorted(self.segments[-1][0]))
+        else:
+            t = min_bars
+        while t < len(x):
+            self.segments.append((index[t], *self._fit(x[:t])))
+            t = self._next_fit(x, t)
+
+    def regimes(self, close):
+        # close: Series ราคาปิด คืน array ของ BEAR/NEUTRAL/BULL ต่อแท่ง (NEUTRAL ช่วงที่ feature ยังไม่ครบหรือยังไม่เคย fit)
+        x = features(close.to_numpy())
+        valid = ~np.isnan(x).any(axis=1)
+        out = np.full(len(x), NEUTRAL)
+        if valid.sum() <= max(10 * self.n_states, self.drift_window):
+            return out
+        x_valid = x[valid]
+        index = close.index[valid]
+        labelled = np.full(len(x_valid), NEUTRAL)
+        with self._lock:
+            self._walk_forward(x_valid, index)
+            starts = index.searchsorted([segment[0] for segment in self.segments])
+            ends = np.append(starts[1:], len(x_valid))
+            for (_, scaler, hmm, labels, _), start, end in zip(self.segments, starts, ends):
+                if start >= end:
+                    continue
+                # กรองต่อจาก drift_window แท่งก่อนหน้า (ข้อมูลอดีต) ให้สถานะตั้งตัวก่อนถึงช่วงของ segment นี้
+                lead = max(start - self.drift_window, 0)
+                z = scaler.transform(x_valid[lead:end])
+                states = _forward_states(_log_emission(hmm, z), hmm.startprob_, hmm.transmat_)
+                labelled[start:end] = labels[states[start - lead:]]
+        out[valid] = labelled
+        return out
+
+
+def regime_gate(regimes, gate):
+    # (buy_ok, sell_ok) ต่อแท่ง: Avoid bear = ห้ามเข้าซื้อในช่วง Bear, Trend-follow = ซื้อเฉพาะ Bull และขายเมื่อไม่ใช่ Bull
+    if gate == 'Avoid bear (buy)':
+        return regimes != BEAR, np.ones(len(regimes), dtype=bool)
+    if gate == 'Trend-follow':
+        return regimes == BULL, regimes != BULL
+    return np.ones(len(regimes), dtype=bool), np.ones(len(regimes), dtype=bool)
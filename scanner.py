@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+import kernels
+from strategy import engulfing, evaluate_conditions
+
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close']
+
+
+def parse_universe(text):
+    # ticker คั่นด้วยบรรทัดใหม่หรือ comma ส่วนหลัง # ถือเป็น comment
+    tickers = []
+    for line in text.splitlines():
+        for ticker in line.split('#')[0].split(','):
+            ticker = ticker.strip().upper()
+            if ticker and ticker not in tickers:
+                tickers.append(ticker)
+    return tickers
+
+
+def read_universe(path):
+    with open(path, encoding='utf-8') as f:
+        return parse_universe(f.read())
+
+
+def frames_from_bars(bars_by_ticker):
+    # แปลง dict ticker -> OHLCV (เช่นจาก BarStore) เป็นตารางกว้าง (วันที่ x ticker) แยกตาม field
+    # ticker ที่ไม่มีข้อมูลถูกตัดทิ้ง
+    bars_by_ticker = {t: df for t, df in bars_by_ticker.items() if df is not None and not df.empty}
+    if not bars_by_ticker:
+        return {field: pd.DataFrame() for field in PRICE_FIELDS}
+    return {field: pd.DataFrame({t: df[field] for t, df in bars_by_ticker.items()}).sort_index()
+            for field in PRICE_FIELDS}
+
+
+def _right_align(values, valid, length):
+    # ชิดขวา: แถวสุดท้ายคือแท่งล่าสุดของแต่ละ ticker ตัดวันที่ ticker นั้นไม่มีข้อมูลทิ้ง
+    # (เช่นหุ้นไม่มีแท่งวันเสาร์อาทิตย์แต่ crypto มี) ผลจึงเหมือนคำนวณทีละ ticker
+    from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+    target = length - from_end
+    rows, cols = np.nonzero(valid & (target >= 0))
+    out = np.full((length, values.shape[1]), np.nan)
+    out[target[rows, cols], cols] = values[rows, cols]
+    return out
+
+
+def scan(frames, rsi_low=40, rsi_high=65, sr_window=20):
+    # คำนวณ MACD/RSI/S/R/Engulfing ของทุก ticker พร้อมกันเป็น array 2 มิติ
+    # แล้วคืนตารางสถานะของแท่งล่าสุด (หนึ่งแถวต่อ ticker)
+    close = frames['Close']
+    if close.empty:
+        return pd.DataFrame()
+
+    valid = close.notna().to_numpy()
+    counts = valid.sum(axis=0)
+    length = int(counts.max())
+    if length < 2:
+        return pd.DataFrame()
+    bars = {field: _right_align(frames[field].to_numpy(dtype=float), valid, length) for field in PRICE_FIELDS}
+    last_row = len(close) - 1 - valid[::-1].argmax(axis=0)
+
+    c = bars['Close']
+    macd, _, signal = kernels.macd(c, 12, 26, 9)
+    rsi = kernels.rsi(c, 14)
+    support = kernels.rolling_min(bars['Low'], sr_window)
+    resistance = kernels.rolling_max(bars['High'], sr_window)
+
+    cond = evaluate_conditions(
+        bars['Low'][-1], bars['High'][-1], support[-1], resistance[-1],
+        rsi[-1], rsi[-2], macd[-1], macd[-2], signal[-1], signal[-2],
+        rsi_low, rsi_high,
+    )
+    bullish, bearish = engulfing(bars['Open'][-1], c[-1], bars['Open'][-2], c[-2])
+    # ข้อมูลน้อยเกินไปสำหรับ S/R ถือว่าไม่มีสัญญาณ เหมือนหน้า dashboard
+    enough = counts > sr_window
+
+    return pd.DataFrame({
+        'Date': close.index[last_row],
+        'Bars': counts,
+        'Close': c[-1],
+        'RSI': rsi[-1],
+        'MACD': macd[-1],
+        'Signal': signal[-1],
+        'Support': support[-1],
+        'Resistance': resistance[-1],
+        'Bullish_Engulfing': bullish,
+        'Bearish_Engulfing': bearish,
+        'Final_Buy': cond['Final_Buy'] & enough,
+        'Final_Sell': cond['Final_Sell'] & enough,
+    }, index=pd.Index(close.columns, name='Ticker'))
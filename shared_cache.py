@@ -0,0 +1,94 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+import pyarrow as pa
+
+from disk_cache import evict_lru
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def default_root():
+    # /dev/shm อยู่ใน RAM (tmpfs) ทุก process ของ server เปิดไฟล์เดียวกันได้โดยไม่แตะดิสก์
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm/macd-shared'
+    return os.path.join(tempfile.gettempdir(), 'macd-shared')
+
+
+class SharedFrameCache:
+    # DataFrame ที่คำนวณแล้ว (ข้อมูล + ตัวชี้วัด + สัญญาณ) ใช้ร่วมกันทุก session และทุก worker process
+    # เก็บเป็น Arrow IPC แบบไม่บีบอัดแล้วเปิดแบบ memory-map: คอลัมน์ตัวเลขชี้ไปที่ page cache ชุดเดียวกันของ OS
+    # จึงไม่มีสำเนาต่อ session (array เป็น read-only: เพิ่ม/แทนคอลัมน์ได้ แต่ห้ามแก้ค่าในที่)
+    # key คือ tuple ใดๆ (ticker/interval/ช่วงข้อมูล/พารามิเตอร์) ลบไฟล์ที่ไม่ได้ใช้นานสุดเมื่อเกิน max_bytes
+
+    def __init__(self, root=None, max_bytes=256 * 1024 * 1024):
+        self.root = root or default_root()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._locks = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _frame_path(self, key):
+        return os.path.join(self.root, self._digest(key) + '.arrow')
+
+    def _digest(self, key):
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def get(self, key):
+        path = self._frame_path(key)
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+            os.utime(path)
+        except (OSError, pa.ArrowException):
+            return None
+        return table.to_pandas(split_blocks=True)
+
+    def put(self, key, frame):
+        path = self._frame_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            table = pa.Table.from_pandas(frame)
+            # from_pandas แปลง NaN เป็น null ซึ่งทำให้อ่านกลับแบบ zero-copy ไม่ได้ จึงเก็บ float ตามเดิม (NaN เป็นค่า)
+            columns = [
+                pa.array(frame[name].to_numpy(), from_pandas=False)
+                if name in frame.columns and frame[name].dtype.kind == 'f' else column
+                for name, column in zip(table.column_names, table.columns)
+            ]
+            table = pa.Table.from_arrays(columns, schema=table.schema)
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        except (OSError, pa.ArrowException):
+            return False
+        with self._lock:
+            evict_lru(self.root, self.max_bytes, keep=path)
+        return True
+
+    def get_or_compute(self, key, compute):
+        # คำนวณครั้งเดียวต่อ key แม้หลาย session/process ขอพร้อมกัน (lock ต่อ key ใน process + flock ข้าม process)
+        frame = self.get(key)
+        if frame is not None:
+            return frame
+        # lock แบ่งเป็น 256 ชุดตาม hash ของ key จำนวนไฟล์ lock จึงไม่โตตาม key
+        stripe = self._digest(key)[:2]
+        with self._lock:
+            lock = self._locks.setdefault(stripe, threading.Lock())
+        with lock, open(os.path.join(self.root, stripe + '.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                frame = self.get(key)
+                if frame is None:
+                    computed = compute()
+                    frame = self.get(key) if self.put(key, computed) else None
+                    frame = computed if frame is None else frame
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return frame
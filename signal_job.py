@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from async_fetch import warm_store
+from pipeline import make_store
+from providers import SOURCES
+from scanner import parse_universe, read_universe
+from signal_store import SignalStore, compute_signals
+
+
+def run_once(tickers, days, rsi_low, rsi_high, sr_window, store, signal_store, source='yfinance', data_dir=None):
+    # โหลด + คำนวณทุก ticker ใน universe แล้วเขียนลง signal_store คืน dict ticker -> error
+    now = datetime.now()
+    start = now - timedelta(days=days)
+    errors = warm_store(store, tickers, start, now=now) if source == 'yfinance' else {}
+    for ticker in tickers:
+        if ticker in errors:
+            continue
+        try:
+            bars = store.get(ticker, start, now=now)
+            if bars is None or len(bars) <= sr_window:
+                errors[ticker] = ValueError("not enough bars")
+                continue
+            signals = compute_signals(bars, rsi_low, rsi_high, sr_window)
+        except Exception as e:
+            errors[ticker] = e
+            continue
+        if not signal_store.save(ticker, source, rsi_low, rsi_high, sr_window, signals, start, computed_at=now,
+                                 data_dir=data_dir):
+            errors[ticker] = OSError("write failed")
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute dashboard signals for a universe into the signal store.")
+    parser.add_argument('--universe', help="ticker list file (one per line or comma separated)")
+    parser.add_argument('--tickers', default='', help="comma separated tickers (added to --universe)")
+    parser.add_argument('--days', type=int, default=1000, help="lookback; the dashboard reuses results for any shorter lookback")
+    parser.add_argument('--rsi-low', type=int, nargs='+', default=[40])
+    parser.add_argument('--rsi-high', type=int, nargs='+', default=[65])
+    parser.add_argument('--sr-window', type=int, nargs='+', default=[20])
+    parser.add_argument('--source', choices=SOURCES, default='yfinance')
+    parser.add_argument('--data-dir', help="directory for the 'Local files' source")
+    parser.add_argument('--out', default=os.environ.get('MACD_SIGNAL_DIR', '.cache/signals'))
+    parser.add_argument('--every', type=float, help="repeat every N minutes instead of running once")
+    args = parser.parse_args(argv)
+
+    tickers = read_universe(args.universe) if args.universe else []
+    tickers += [t for t in parse_universe(args.tickers) if t not in tickers]
+    if not tickers:
+        parser.error("no tickers given (use --universe and/or --tickers)")
+
+    # โฟลเดอร์เดียวกับที่หน้า dashboard ใช้เป็นค่าเริ่มต้น เพื่อให้ key ของ SignalStore ตรงกัน
+    data_dir = (args.data_dir or os.environ.get('MACD_DATA_DIR', 'data')) if args.source == 'Local files' else None
+    store = make_store(args.source, data_dir)
+    signal_store = SignalStore(args.out)
+
+    while True:
+        started = time.perf_counter()
+        failed = 0
+        for rsi_low in args.rsi_low:
+            for rsi_high in args.rsi_high:
+                for sr_window in args.sr_window:
+                    errors = run_once(tickers, args.days, rsi_low, rsi_high, sr_window, store, signal_store, args.source,
+                                      data_dir)
+                    for ticker, error in errors.items():
+                        print(f"  {ticker} (rsi {rsi_low}/{rsi_high}, sr {sr_window}): {error}", file=sys.stderr)
+                    failed += len(errors)
+        print(f"{datetime.now():%Y-%m-%d %H:%M:%S} wrote signals for {len(tickers)} tickers to {args.out} "
+              f"in {time.perf_counter() - started:.1f}s ({failed} failed)")
+        if args.every is None:
+            return 1 if failed else 0
+        time.sleep(max(args.every * 60 - (time.perf_counter() - started), 0))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import hashlib
+import os
+from datetime import datetime
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+
+import kernels
+from bar_store import _align
+from indicators import IndicatorEngine
+
+
+def compute_signals(bars, rsi_low=40, rsi_high=65, sr_window=20):
+    # คำนวณทุกคอลัมน์ที่หน้า dashboard ใช้ในครั้งเดียว (MACD/RSI/S/R/Engulfing/เงื่อนไข/Final_Buy/Final_Sell)
+    m_line, m_hist, m_signal = IndicatorEngine().columns[:3]
+    df = bars.copy()
+    df[m_line], df[m_hist], df[m_signal] = kernels.macd(df['Close'].to_numpy())
+    df['RSI'] = kernels.rsi(df['Close'].to_numpy(), 14)
+    df['RSI_Up'] = df['RSI'] > df['RSI'].shift(1)
+    df['Support'] = kernels.rolling_min(df['Low'].to_numpy(), sr_window)
+    df['Resistance'] = kernels.rolling_max(df['High'].to_numpy(), sr_window)
+    df['Bullish_Engulfing'], df['Bearish_Engulfing'] = kernels.engulfing(df['Open'].to_numpy(), df['Close'].to_numpy())
+
+    cond = kernels.decide(df['Low'], df['High'], df['Support'], df['Resistance'], df['RSI'], df[m_line], df[m_signal],
+                          rsi_low, rsi_high)
+    for column in kernels.DECISION_COLUMNS:
+        df[column] = cond[column]
+    return df
+
+
+class SignalStore:
+    # ผลของ compute_signals ต่อ ticker + แหล่งข้อมูล + ชุดพารามิเตอร์ เก็บเป็นไฟล์ Arrow IPC (บีบอัด zstd)
+    # เขียนโดย signal_job.py และอ่านโดยหน้า dashboard แทนการโหลด + คำนวณใหม่
+    # data_dir (แหล่ง 'Local files') เป็นส่วนหนึ่งของ key เพราะชื่อ ticker เดียวกันในคนละโฟลเดอร์เป็นข้อมูลคนละชุด
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, ticker, source, rsi_low, rsi_high, sr_window, data_dir=None):
+        if data_dir:
+            source += '-' + hashlib.sha1(os.path.abspath(data_dir).encode()).hexdigest()[:12]
+        name = f"{quote(ticker, safe='')}_{quote(source, safe='')}_{rsi_low}_{rsi_high}_{sr_window}.arrow"
+        return os.path.join(self.root, name)
+
+    def save(self, ticker, source, rsi_low, rsi_high, sr_window, signals, start, computed_at=None, data_dir=None):
+        path = self._path(ticker, source, rsi_low, rsi_high, sr_window, data_dir)
+        tmp = path + '.tmp'
+        computed_at = computed_at or datetime.now()
+        try:
+            table = pa.Table.from_pandas(signals)
+            meta = dict(table.schema.metadata or {})
+            meta[b'start'] = pd.Timestamp(start).isoformat().encode()
+            meta[b'computed_at'] = pd.Timestamp(computed_at).isoformat().encode()
+            table = table.replace_schema_metadata(meta)
+
+            options = pa.ipc.IpcWriteOptions(compression='zstd')
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        except (OSError, pa.ArrowException):
+            return False
+        return True
+
+    def load(self, ticker, source, rsi_low, rsi_high, sr_window, start=None, max_age=None, now=None, data_dir=None):
+        # คืน None ถ้าไม่มีไฟล์ ไฟล์เก่ากว่า max_age หรือไม่ครอบคลุมช่วงตั้งแต่ start
+        path = self._path(ticker, source, rsi_low, rsi_high, sr_window, data_dir)
+        try:
+            with pa.memory_map(path) as source_file:
+                table = pa.ipc.open_file(source_file).read_all()
+        except (OSError, pa.ArrowException):
+            return None
+
+        meta = table.schema.metadata or {}
+        if b'start' not in meta or b'computed_at' not in meta:
+            return None
+        now = now or datetime.now()
+        if max_age is not None and now - pd.Timestamp(meta[b'computed_at'].decode()) > max_age:
+            return None
+        if start is not None and pd.Timestamp(meta[b'start'].decode()) > pd.Timestamp(start):
+            return None
+
+        signals = table.to_pandas()
+        if start is not None:
+            signals = signals[signals.index >= _align(pd.Timestamp(start), signals.index)]
+        return signals
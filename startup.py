@@ -0,0 +1,49 @@
+import argparse
+import re
+import subprocess
+import sys
+
+# module ที่ app.py import ตอนเริ่ม (ต้องตรงกับส่วนบนของ app.py) ส่วน pandas_ta/plotly/yfinance/aiohttp/numba/hmmlearn
+# ถูก import เมื่อขั้นที่ใช้ทำงานครั้งแรก
+APP_IMPORTS = [
+    'streamlit', 'numpy', 'pandas',
+    'async_fetch', 'backtest', 'bar_store', 'charts', 'compact', 'disk_cache', 'indicators', 'kernels',
+    'optimize', 'parallel', 'providers', 'regime', 'scanner', 'shared_cache', 'signal_store',
+    'support_resistance', 'timeframes',
+]
+LAZY_IMPORTS = ['pandas_ta', 'plotly.graph_objects', 'yfinance', 'aiohttp', 'numba', 'hmmlearn.hmm', 'live']
+LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def importtime(modules, python=sys.executable):
+    # import modules ใน process ใหม่ (เหมือน container เพิ่งบูต) ด้วย python -X importtime
+    # คืน [(package บนสุด, วินาที)] เรียงจากมากไปน้อย (รวม self time ของทุก sub-module) และเวลารวม
+    code = '; '.join(f'import {module}' for module in modules)
+    result = subprocess.run([python, '-X', 'importtime', '-c', code], capture_output=True, text=True, timeout=300)
+    totals = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            package = match.group(4).split('.')[0]
+            totals[package] = totals.get(package, 0) + int(match.group(1))
+    rows = sorted(((package, us / 1e6) for package, us in totals.items()), key=lambda row: -row[1])
+    return rows, sum(seconds for _, seconds in rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report per-package import cost of the app's startup path.")
+    parser.add_argument('--modules', nargs='+', default=APP_IMPORTS)
+    parser.add_argument('--lazy', action='store_true', help="also import the lazily loaded dependencies")
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args(argv)
+
+    modules = args.modules + (LAZY_IMPORTS if args.lazy else [])
+    rows, total = importtime(modules)
+    for package, seconds in rows[:args.top]:
+        print(f"  {package:<28} {seconds * 1000:10.1f} ms")
+    print(f"total {total * 1000:.1f} ms for {len(modules)} modules")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
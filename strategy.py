@@ -0,0 +1,30 @@
+def evaluate_conditions(low, high, support, resistance, rsi, rsi_prev, macd, macd_prev, signal, signal_prev,
+                        rsi_low, rsi_high):
+    # กฎ Strict ของระบบ ใช้ได้ทั้งกับ pandas Series (หน้า dashboard) และ numpy array (scanner)
+    # *_prev คือค่าของแท่งก่อนหน้า (shift(1))
+    cond = {
+        # BUY ENTRY
+        'buy_price': low <= (support * 1.02),
+        'buy_rsi': (rsi < rsi_low) & (rsi > rsi_prev),
+        'buy_macd': (macd > signal) & (macd_prev <= signal_prev),
+        # SELL EXIT
+        'sell_price': high >= (resistance * 0.98),
+        'sell_rsi': rsi > rsi_high,
+        'sell_macd': (macd < signal) & (macd_prev >= signal_prev),
+    }
+    cond['Final_Buy'] = cond['buy_price'] & cond['buy_rsi'] & cond['buy_macd']
+    cond['Final_Sell'] = cond['sell_price'] & cond['sell_rsi'] & cond['sell_macd']
+    return cond
+
+
+def engulfing(open_, close, prev_open, prev_close):
+    # กติกาเดียวกับ CDLENGULFING ของ TA-Lib: แท่งปัจจุบันกลืนตัวแท่งก่อนหน้าและสีตรงข้ามกัน
+    white = close >= open_
+    prev_white = prev_close >= prev_open
+    bullish = white & ~prev_white & (
+        ((close >= prev_open) & (open_ < prev_close)) | ((close > prev_open) & (open_ <= prev_close))
+    )
+    bearish = ~white & prev_white & (
+        ((open_ >= prev_close) & (close < prev_open)) | ((open_ > prev_close) & (close <= prev_open))
+    )
+    return bullish, bearish
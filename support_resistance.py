@@ -0,0 +1,50 @@
+import numpy as np
+
+SR_WINDOWS = np.arange(10, 51)
+
+
+def rolling_extrema(x, windows, op):
+    # rolling min/max ของทุก window พร้อมกันด้วย sparse table (op = np.minimum หรือ np.maximum)
+    # levels[k][j] = op ของ x[j : j + 2**k] แล้ว window ยาว w ใดๆ = op ของสองช่วง 2**k ที่ทับกัน
+    # ผลเหมือน Series.rolling(w).min()/max(): แถวแรกๆ ที่ยังไม่ครบ w และ window ที่มี NaN ให้ผล NaN
+    x = np.asarray(x, dtype=float)
+    windows = np.asarray(windows)
+    n = len(x)
+    out = np.full((len(windows), n), np.nan)
+
+    levels = [x]
+    while len(windows) and 2 ** len(levels) <= windows.max():
+        half = 2 ** (len(levels) - 1)
+        prev = levels[-1]
+        levels.append(op(prev[:-half], prev[half:]))
+
+    for i, w in enumerate(windows):
+        w = int(w)
+        if w > n:
+            continue
+        k = w.bit_length() - 1
+        span = 2 ** k
+        table = levels[k]
+        out[i, w - 1:] = op(table[:n - w + 1], table[w - span:n - span + 1])
+    return out
+
+
+class SRTable:
+    # Support/Resistance ของทุก window ใน windows คำนวณครั้งเดียวต่อ series
+    # เปลี่ยน S/R window แล้วเป็นแค่การเลือกแถว
+
+    def __init__(self, low, high, windows=SR_WINDOWS):
+        self.windows = np.asarray(windows)
+        self._row = {int(w): i for i, w in enumerate(self.windows)}
+        self.low = np.asarray(low, dtype=float)
+        self.high = np.asarray(high, dtype=float)
+        self.support = rolling_extrema(self.low, self.windows, np.minimum)
+        self.resistance = rolling_extrema(self.high, self.windows, np.maximum)
+
+    def get(self, window):
+        row = self._row.get(int(window))
+        if row is None:
+            # window นอกตาราง คำนวณเฉพาะ window นั้น
+            return (rolling_extrema(self.low, [window], np.minimum)[0],
+                    rolling_extrema(self.high, [window], np.maximum)[0])
+        return self.support[row], self.resistance[row]
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+
+def synthetic_ohlcv(bars, start='2000-01-03', freq='1min', price=100.0, volatility=0.002, seed=0):
+    # OHLCV แบบ random walk (log-normal) หน้าตาเหมือนผลของ yf.download ใช้ทดสอบ/benchmark แบบ offline
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start=start, periods=bars, freq=freq, name='Date')
+    close = price * np.exp(np.cumsum(rng.normal(0, volatility, bars)))
+    open_ = np.empty(bars)
+    open_[0] = price
+    open_[1:] = close[:-1]
+    spread = np.abs(rng.normal(0, volatility, (2, bars))) * close
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread[0],
+        'Low': np.minimum(open_, close) - spread[1],
+        'Close': close,
+        'Volume': rng.integers(1_000, 1_000_000, bars),
+    }, index=index)
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+import kernels
+
+TIMEFRAMES = ['1m', '5m', '1h', '1d', '1w']
+FREQ = {'1m': '1min', '5m': '5min', '1h': '1h', '1d': '1D', '1w': 'W-MON'}
+# interval ที่แหล่งข้อมูลมีให้โหลดตรงๆ (จากละเอียดไปหยาบ) และจำนวนวันย้อนหลังสูงสุดที่ yfinance ให้ (None = ไม่จำกัด)
+BASES = [('1m', 7), ('5m', 60), ('1h', 730), ('1d', None)]
+OHLCV_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def plan(timeframe, days, store=None, ticker=None, now=None):
+    # ถ้า store (BarStore) มี series ของ ticker ที่ละเอียดกว่าซึ่งครอบคลุมช่วงนี้อยู่แล้ว resample จากตัวนั้น (ตัวที่หยาบที่สุดก่อน)
+    # ไม่งั้นโหลด timeframe นั้นตรงๆ ถ้าแหล่งข้อมูลมี หรือ (1w) resample จาก base ที่หยาบที่สุดซึ่งละเอียดกว่า
+    # BarStore ปัดจุดเริ่มลงเป็นเที่ยงคืน จึงตัด intraday เหลือ limit - 1 วัน ให้จุดเริ่มหลังปัดยังอยู่ในช่วงที่โหลดได้
+    # คืน (base interval, จำนวนวันที่โหลด) ซึ่งอาจน้อยกว่า days
+    limits = dict(BASES)
+    order = TIMEFRAMES.index(timeframe)
+    finer = [base for base, _ in BASES if TIMEFRAMES.index(base) < order]
+    if store is not None:
+        start = (pd.Timestamp(now or datetime.now()) - timedelta(days=days)).normalize()
+        for base in reversed(finer):
+            span = store.span(ticker, base)
+            if (limits[base] is None or days < limits[base]) and span is not None and span[0] <= start:
+                return base, days
+    interval = timeframe if timeframe in limits else finer[-1]
+    limit = limits[interval]
+    return interval, days if limit is None else min(days, limit - 1)
+
+
+def resample_ohlcv(df, freq):
+    # label/closed ด้านซ้าย: แท่งมี timestamp เป็นเวลาเปิด เหมือนแท่งจาก yfinance
+    agg = {column: how for column, how in OHLCV_AGG.items() if column in df.columns}
+    return df.resample(freq, label='left', closed='left').agg(agg).dropna(subset=['Close'])
+
+
+def to_timeframe(df, base, timeframe):
+    if df is None or base == timeframe:
+        return df
+    return resample_ohlcv(df, FREQ[timeframe])
+
+
+def higher_trend(df, timeframe, index):
+    # ทิศ MACD (อยู่เหนือ/ใต้ Signal) ของ timeframe ที่สูงกว่า ณ แท่งของ index
+    # ใช้เฉพาะแท่งที่ปิดแล้ว (เลื่อน timestamp ไปเป็นเวลาปิด) เพื่อไม่ให้ backtest เห็นอนาคต
+    higher = resample_ohlcv(df, FREQ[timeframe])
+    line, _, signal = kernels.macd(higher['Close'].to_numpy())
+    state = pd.Series(np.sign(line - signal), index=higher.index + to_offset(FREQ[timeframe]))
+    aligned = state.reindex(index, method='ffill').to_numpy()
+    return aligned > 0, aligned < 0